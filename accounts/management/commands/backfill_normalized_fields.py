@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import UserProfile
+from accounts.utils import backfill_normalized_fields
+
+
+class Command(BaseCommand):
+    help = ("Recomputes the normalized city/sport/status search columns of every profile, e.g. after "
+            "rows were changed with queryset.update() or the normalization rules changed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = backfill_normalized_fields(UserProfile, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Normalized {updated} profiles."))
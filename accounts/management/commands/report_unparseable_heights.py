@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Lists profiles whose free-form height could not be normalized to height_cm, "
+            "so they can be fixed by hand instead of silently dropping out of height searches.")
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.filter(height_cm__isnull=True).exclude(height__isnull=True).exclude(height='')
+        count = 0
+        for profile in profiles.only('id', 'username', 'height').iterator(chunk_size=1000):
+            self.stdout.write(f"{profile.id}\t@{profile.username}\t{profile.height!r}")
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"{count} profiles with an unparseable height."))
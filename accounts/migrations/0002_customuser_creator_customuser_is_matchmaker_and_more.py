@@ -0,0 +1,149 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='creator',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='is_matchmaker',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='country',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='is_promotion',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='is_verified',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='status',
+            field=models.CharField(choices=[('Free', 'Free'), ('Ready to fight', 'Ready to fight'), ('Injury', 'Injury'), ('I will be ready in 30 days', 'I will be ready in 30 days'), ('I will be ready in 60 days', 'I will be ready in 60 days'), ('I will be ready in 90 days', 'I will be ready in 90 days'), ('I have a contract', 'I have a contract')], default='Free', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='username',
+            field=models.CharField(blank=True, max_length=150),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='birth_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='city',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='full_name',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='height',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to='profiles_pictures/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='sport',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='sport_time',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='video_links',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='weight',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sport', models.CharField(max_length=100)),
+                ('occupied_place', models.CharField(max_length=100)),
+                ('country', models.CharField(max_length=100)),
+                ('tournament_name', models.CharField(max_length=255)),
+                ('diploma', models.FileField(upload_to='diplomas/')),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to='accounts.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlaceOfClasses',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100)),
+                ('sport', models.CharField(max_length=100)),
+                ('club_name', models.CharField(max_length=100)),
+                ('duration', models.CharField(max_length=100)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='places_of_classes', to='accounts.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='substatuses', to='accounts.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserDocuments',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document1', models.FileField(upload_to='user_documents/')),
+                ('document2', models.FileField(upload_to='user_documents/')),
+                ('document3', models.FileField(upload_to='user_documents/')),
+                ('document4', models.FileField(upload_to='user_documents/')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Favourite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('favourite_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favourited_by', to='accounts.userprofile')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favourites', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'favourite_profile')},
+            },
+        ),
+    ]
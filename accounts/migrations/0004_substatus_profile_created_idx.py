@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_total_likes_total_comments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='substatus',
+            index=models.Index(fields=['user_profile', '-created_at'], name='substatus_profile_created_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'accounts_userprofile_search'
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite specific, other databases use core.search.DatabaseSearchBackend
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        f"full_name, username, city, sport, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, full_name, username, city, sport) "
+        f"SELECT id, COALESCE(full_name, ''), COALESCE(username, ''), COALESCE(city, ''), COALESCE(sport, '') "
+        f"FROM accounts_userprofile"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_substatus_profile_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
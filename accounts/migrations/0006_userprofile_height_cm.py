@@ -0,0 +1,48 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:10
+
+import logging
+
+from django.db import migrations, models
+
+from accounts.utils import parse_height_cm
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def backfill_height_cm(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    unparseable = []
+    last_id = 0
+    while True:
+        profiles = list(UserProfile.objects.filter(id__gt=last_id).order_by('id').only('id', 'height')[:BATCH_SIZE])
+        if not profiles:
+            break
+        last_id = profiles[-1].id
+        for profile in profiles:
+            profile.height_cm = parse_height_cm(profile.height)
+            if profile.height and profile.height_cm is None:
+                unparseable.append((profile.id, profile.height))
+        UserProfile.objects.bulk_update(profiles, ['height_cm'])
+
+    if unparseable:
+        logger.warning(f"{len(unparseable)} profile heights could not be parsed and have no height_cm")
+        for profile_id, height in unparseable:
+            logger.warning(f"Unparseable height {height!r} on profile {profile_id}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_userprofile_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='height_cm',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_height_cm, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_userprofile_birth_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['weight'], name='profile_weight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('is_verified', True)), fields=['weight', 'user'], name='profile_ver_weight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('is_verified', True)), fields=['sport_time'], name='profile_ver_sport_time_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+from accounts.utils import backfill_normalized_fields
+
+
+def backfill(apps, schema_editor):
+    backfill_normalized_fields(apps.get_model('accounts', 'UserProfile'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_userprofile_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='city_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='sport_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='status_norm',
+            field=models.CharField(blank=True, default='', editable=False, max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['city_norm', 'sport_norm'], name='profile_city_sport_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['sport_norm', 'weight'], name='profile_sport_weight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['status_norm', 'weight'], name='profile_status_weight_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
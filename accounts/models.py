@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.utils.timezone import now
+from django.utils.timezone import localdate
 from core import settings
+from .utils import NORMALIZED_FIELDS, age_on, normalize_text, parse_height_cm
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class CustomUser(AbstractUser):
@@ -25,9 +29,11 @@ class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile')
     username = models.CharField(max_length=150, blank=True)  # New field for storing username
     full_name = models.CharField(max_length=100, null=True, blank=True)
-    birth_date = models.DateField(null=True, blank=True)  # Allow null
+    birth_date = models.DateField(null=True, blank=True, db_index=True)  # Allow null
     weight = models.IntegerField(null=True, blank=True)  # Changed to IntegerField
     height = models.CharField(max_length=50, null=True, blank=True)
+    # `height` normalized to whole centimetres on save, used by every height filter
+    height_cm = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, editable=False)
     sport = models.CharField(max_length=100, null=True, blank=True)
     city = models.CharField(max_length=100, null=True, blank=True)
     country = models.CharField(max_length=100, null=True, blank=True)
@@ -41,16 +47,60 @@ class UserProfile(models.Model):
     rank = models.BooleanField(default=False)
     rank_file = models.FileField(upload_to='rank_files/', null=True, blank=True)
     video_links = models.TextField(blank=True, null=True)
+    # Likes and comments received on all of the user's posts, see profiles.Post counters
+    total_likes = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    # Only ever changed through F() updates, never by saving a loaded instance
+    COUNTER_FIELDS = ('total_likes', 'total_comments')
+    # normalize_text() copies of city, sport and status, used by every search filter on them
+    city_norm = models.CharField(max_length=100, blank=True, default='', editable=False)
+    sport_norm = models.CharField(max_length=100, blank=True, default='', editable=False)
+    status_norm = models.CharField(max_length=30, blank=True, default='', editable=False)
+
+    class Meta:
+        # One index per search filter combination; `manage.py check_query_plans` fails when a
+        # search shape stops using them. birth_date and height_cm are indexed on the field.
+        indexes = [
+            # Weight ranges on the public search, alone or with any other filter
+            models.Index(fields=['weight'], name='profile_weight_idx'),
+            # Exact city/sport/status matches, alone or narrowed by weight
+            models.Index(fields=['city_norm', 'sport_norm'], name='profile_city_sport_idx'),
+            models.Index(fields=['sport_norm', 'weight'], name='profile_sport_weight_idx'),
+            models.Index(fields=['status_norm', 'weight'], name='profile_status_weight_idx'),
+            # Verified-only searches (UserSearchListView) and the home fighter sample index,
+            # which reads (weight, user_id) straight from the index
+            models.Index(fields=['weight', 'user'], condition=models.Q(is_verified=True),
+                         name='profile_ver_weight_idx'),
+            models.Index(fields=['sport_time'], condition=models.Q(is_verified=True),
+                         name='profile_ver_sport_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.height_cm = parse_height_cm(self.height)
+        if self.height and self.height_cm is None:
+            logger.warning(f"Unparseable height {self.height!r} on profile {self.pk}")
+        for field, normalized in NORMALIZED_FIELDS.items():
+            setattr(self, normalized, normalize_text(getattr(self, field)))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Counters are changed with F() updates by the like/comment views; writing back the
+            # copy loaded with this instance would undo any counted in the meantime
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+            kwargs['update_fields'] = update_fields
+        if update_fields is not None:
+            derived = {NORMALIZED_FIELDS[field] for field in update_fields if field in NORMALIZED_FIELDS}
+            if 'height' in update_fields:
+                derived.add('height_cm')
+            kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
 
     @property
     def fight_record_summary(self):
         if not self.is_verified:
             return None
-        approved_fights = self.fight_records.filter(is_approved=True)
-        wins = approved_fights.filter(status='WIN').count()
-        loses = approved_fights.filter(status='LOSE').count()
-        draws = approved_fights.filter(status='DRAW').count()
-        return f"{wins} - {draws} - {loses}"
+        from profiles.models import FightStats
+        return str(FightStats.for_profile(self))
 
 
 class UserDocuments(models.Model):
@@ -85,8 +135,7 @@ class WaitingVerifiedUsers(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def age(self):
-        return now().year - self.birth_date.year - (
-                    (now().month, now().day) < (self.birth_date.month, self.birth_date.day))
+        return age_on(self.birth_date, localdate())
 
 
 class Favourite(models.Model):
@@ -105,6 +154,12 @@ class SubStatus(models.Model):
     message = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves the "latest substatus per profile" subquery
+            models.Index(fields=['user_profile', '-created_at'], name='substatus_profile_created_idx'),
+        ]
+
     def __str__(self):
         return f"SubStatus for {self.user_profile.user.username}: {self.message}"
 
@@ -8,6 +8,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
 from rest_framework import serializers
 
+from core.serializers import ViewerStateListSerializer, DynamicFieldsMixin, get_viewer_state
 from accounts.models import UserProfile, PromotionProfile, CustomUser, WaitingVerifiedUsers, UserDocuments, Favourite, \
     SubStatus, PlaceOfClasses, Achievement
 
@@ -237,11 +238,25 @@ class PaymentSerializer(serializers.Serializer):
         return value
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    is_favourite = serializers.SerializerMethodField()
+    fight_stats = serializers.CharField(source='fight_record_summary', read_only=True)
+
     class Meta:
         model = UserProfile
-        fields = '__all__'
+        # Derived columns kept for filtering only (see UserProfile.save)
+        exclude = ['height_cm', 'city_norm', 'sport_norm', 'status_norm']
         ref_name = "AccountsUserProfile"
+        list_serializer_class = ViewerStateListSerializer
+
+    def load_viewer_state(self, profiles, state):
+        state.load_profiles(profile.pk for profile in profiles)
+
+    def get_is_favourite(self, obj):
+        state = get_viewer_state(self.context)
+        if state is None:
+            return False
+        return state.is_favourite(obj.pk)
 
 
 class PromotionProfileSerializer(serializers.ModelSerializer):
@@ -298,10 +313,12 @@ class WaitingVerifiedUserSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        user_profile = UserProfile.objects.filter(user=instance.user).first()
-        if user_profile:
-            profile_serializer = UserProfileSerializer(user_profile)
-            representation['profile'] = profile_serializer.data
+        # Joined by WaitingVerifiedUsersListView
+        try:
+            user_profile = instance.user.profile
+        except UserProfile.DoesNotExist:
+            return representation
+        representation['profile'] = UserProfileSerializer(user_profile).data
         return representation
 
 
@@ -324,6 +341,10 @@ class FavouriteSerializer(serializers.ModelSerializer):
         model = Favourite
         fields = ['user', 'favourite_profile']
         read_only_fields = ['user']
+        list_serializer_class = ViewerStateListSerializer
+
+    def load_viewer_state(self, favourites, state):
+        state.load_profiles(favourite.favourite_profile_id for favourite in favourites)
 
 
 class SubStatusSerializer(serializers.ModelSerializer):
@@ -1,3 +1,80 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.эждлонек3420щ-9876й    Ф
\ No newline at end of file
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ValidationError
+
+from .utils import age_on, birth_date_range, parse_height_cm, parse_height_param
+
+
+class ParseHeightTests(SimpleTestCase):
+    def test_formats(self):
+        cases = {
+            '180': 180,
+            ' 180 cm ': 180,
+            '180см': 180,
+            '180.4': 180,
+            '1.80 m': 180,
+            '1,8': 180,
+            '1.85': 185,
+            '1,75 м': 175,
+            '5\'11"': 180,
+            '6 ft': 183,
+            '5ft 7in': 170,
+            172: 172,
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(parse_height_cm(value), expected)
+
+    def test_unparseable(self):
+        for value in (None, '', '   ', 'tall', '180 kg', '1.8.0', '5 foot eleven'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_height_cm(value))
+
+    def test_out_of_range(self):
+        for value in ('30', '300', '9 m', '0'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_height_cm(value))
+
+    def test_param(self):
+        self.assertEqual(parse_height_param('height_min', '1.70 m'), 170)
+        with self.assertRaises(ValidationError) as raised:
+            parse_height_param('height_min', 'tall')
+        self.assertIn('height_min', raised.exception.detail)
+
+
+class AgeTests(SimpleTestCase):
+    def test_birthday_boundary(self):
+        born = datetime.date(1990, 6, 15)
+        self.assertEqual(age_on(born, datetime.date(2020, 6, 14)), 29)
+        self.assertEqual(age_on(born, datetime.date(2020, 6, 15)), 30)
+        self.assertEqual(age_on(born, datetime.date(2020, 12, 31)), 30)
+
+    def test_born_on_february_29(self):
+        born = datetime.date(2000, 2, 29)
+        self.assertEqual(age_on(born, datetime.date(2023, 2, 28)), 22)
+        self.assertEqual(age_on(born, datetime.date(2023, 3, 1)), 23)
+        self.assertEqual(age_on(born, datetime.date(2024, 2, 28)), 23)
+        self.assertEqual(age_on(born, datetime.date(2024, 2, 29)), 24)
+
+    def test_range_bounds(self):
+        today = datetime.date(2024, 6, 15)
+        self.assertEqual(birth_date_range(age_min=18, today=today), (None, datetime.date(2006, 6, 15)))
+        self.assertEqual(birth_date_range(age_max=30, today=today), (datetime.date(1993, 6, 16), None))
+        self.assertEqual(birth_date_range(today=today), (None, None))
+
+    def test_range_on_february_29(self):
+        # 2006 has no February 29th, so the youngest 18 year old was born on the 28th
+        today = datetime.date(2024, 2, 29)
+        self.assertEqual(birth_date_range(age_min=18, age_max=18, today=today),
+                         (datetime.date(2005, 3, 1), datetime.date(2006, 2, 28)))
+
+    def test_range_matches_age_on(self):
+        for today in (datetime.date(2024, 2, 29), datetime.date(2023, 2, 28),
+                      datetime.date(2023, 3, 1), datetime.date(2024, 12, 31)):
+            earliest, latest = birth_date_range(age_min=20, age_max=21, today=today)
+            born = datetime.date(today.year - 23, 1, 1)
+            while born.year <= today.year - 19:
+                with self.subTest(today=today, born=born):
+                    self.assertEqual(earliest <= born <= latest, 20 <= age_on(born, today) <= 21)
+                born += datetime.timedelta(days=1)
@@ -0,0 +1,141 @@
+import datetime
+import re
+import unicodedata
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+# Plausible human heights; anything outside is treated as a typo rather than stored
+MIN_HEIGHT_CM = 50
+MAX_HEIGHT_CM = 272
+
+_FEET_INCHES = re.compile(r"^(\d)\s*(?:'|ft|feet)\s*(?:(\d{1,2}(?:\.\d+)?)\s*(?:\"|''|in|inches)?)?$")
+_METRES = re.compile(r'^(\d(?:\.\d+)?)\s*(?:m|м)$')
+_CENTIMETRES = re.compile(r'^(\d+(?:\.\d+)?)\s*(?:cm|см)?$')
+
+# Free-form UserProfile fields filtered by exact match, and the normalized column kept for each
+NORMALIZED_FIELDS = {
+    'city': 'city_norm',
+    'sport': 'sport_norm',
+    'status': 'status_norm',
+}
+
+
+def parse_height_cm(value):
+    """
+    Normalizes a free-form height ("180", "180 cm", "1.80 m", "1,8", "5'11\\"") to whole
+    centimetres. Returns None when the value is empty or can't be understood.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().lower().replace(',', '.')
+    if not text:
+        return None
+
+    match = _FEET_INCHES.match(text)
+    if match:
+        height = int(match.group(1)) * 30.48 + float(match.group(2) or 0) * 2.54
+    elif _METRES.match(text):
+        height = float(_METRES.match(text).group(1)) * 100
+    elif _CENTIMETRES.match(text):
+        height = float(_CENTIMETRES.match(text).group(1))
+        # A bare "1.85" is metres
+        if height < 3:
+            height *= 100
+    else:
+        return None
+
+    height = round(height)
+    if not MIN_HEIGHT_CM <= height <= MAX_HEIGHT_CM:
+        return None
+    return height
+
+
+def parse_height_param(name, value):
+    # Query parameter variant: a height that can't be understood is reported as a 400
+    height_cm = parse_height_cm(value)
+    if height_cm is None:
+        raise ValidationError({name: f"Unrecognized height {value!r}, expected centimetres such as 180."})
+    return height_cm
+
+
+_EXPERIENCE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:(years?|yrs?|y|год[а]?|лет|г)|(months?|mos?|мес\w*))?')
+
+
+def parse_experience_years(value):
+    """
+    Reads the training experience out of a free-form sport_time ("5 years", "3,5", "18 months",
+    "7 лет") as a number of years. A bare number is years. Returns None when there is no number.
+    """
+    if not value:
+        return None
+    match = _EXPERIENCE.search(str(value).strip().lower())
+    if not match:
+        return None
+    years = float(match.group(1).replace(',', '.'))
+    if match.group(3):
+        years /= 12
+    return years
+
+
+def normalize_text(value):
+    """
+    Search key for a free-form value: casefolded, accents stripped and whitespace collapsed,
+    so " Almaty ", "ALMATY" and "Almatý" compare equal, as do "Ёлка" and "елка".
+    """
+    if not value:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value).casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
+
+
+def backfill_normalized_fields(model, batch_size=1000):
+    """
+    Recomputes the NORMALIZED_FIELDS columns of every `model` row in id ordered batches.
+    Takes the model class so migrations can pass their historical UserProfile.
+    Returns the number of rows written.
+    """
+    sources = list(NORMALIZED_FIELDS)
+    targets = list(NORMALIZED_FIELDS.values())
+    updated = 0
+    last_id = 0
+    while True:
+        profiles = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', *sources)[:batch_size])
+        if not profiles:
+            return updated
+        last_id = profiles[-1].id
+        for profile in profiles:
+            for source, target in NORMALIZED_FIELDS.items():
+                setattr(profile, target, normalize_text(getattr(profile, source)))
+        model.objects.bulk_update(profiles, targets)
+        updated += len(profiles)
+
+
+def age_on(birth_date, today):
+    # Completed years: the birthday only counts once it has been reached this year
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def _latest_birth_date_for_age(age, today):
+    # The last birth date of someone who has turned `age` by `today`
+    try:
+        return today.replace(year=today.year - age)
+    except ValueError:
+        # Today is February 29th and that year has none
+        return today.replace(year=today.year - age, day=28)
+
+
+def birth_date_range(age_min=None, age_max=None, today=None):
+    """
+    Converts an age range to (earliest, latest) birth date bounds, either of which may be
+    None, so age filters become plain indexable comparisons on birth_date:
+    age >= age_min  <=>  birth_date <= latest
+    age <= age_max  <=>  birth_date >= earliest
+    """
+    today = today or timezone.localdate()
+    latest = _latest_birth_date_for_age(age_min, today) if age_min is not None else None
+    earliest = None
+    if age_max is not None:
+        earliest = _latest_birth_date_for_age(age_max + 1, today) + datetime.timedelta(days=1)
+    return earliest, latest
@@ -1,5 +1,6 @@
 from django.db.models import Q
-from django.shortcuts import get_list_or_404, get_object_or_404
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg.views import get_schema_view
@@ -7,6 +8,10 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.views import APIView
 from django.utils import timezone
 
+from core.pagination import SearchPagination, json_lines_response
+from core.search import get_search_backend, ranked, search_profile_ids
+from .utils import normalize_text, parse_height_param
+
 from .models import WaitingVerifiedUsers, UserProfile, PromotionProfile, CustomUser, UserDocuments, Favourite, \
     SubStatus, UserDocuments, Achievement, PlaceOfClasses
 from .serializers import RegisterSerializer, UserDetailsSerializer, UserSportsDetailsSerializer, LoginSerializer, \
@@ -255,24 +260,27 @@ class WaitingVerifiedUsersListView(generics.ListAPIView):
     authentication_classes = [TokenAuthentication]
 
     def get_queryset(self):
-        queryset = WaitingVerifiedUsers.objects.filter(user__is_verified=False).select_related('user').prefetch_related(
-            'user__profile')
+        # The nested profile renders its fight stats, so both are joined
+        queryset = WaitingVerifiedUsers.objects.filter(user__is_verified=False).select_related('user__profile__stats')
         full_name = self.request.query_params.get('full_name')
         city = self.request.query_params.get('city')
         height = self.request.query_params.get('height')
         weight = self.request.query_params.get('weight')
         sport = self.request.query_params.get('sport')
 
-        if full_name:
-            queryset = queryset.filter(user__profile__full_name__icontains=full_name)
         if city:
-            queryset = queryset.filter(user__profile__city__icontains=city)
+            queryset = queryset.filter(user__profile__city_norm__contains=normalize_text(city))
         if height:
-            queryset = queryset.filter(user__profile__height__icontains=height)
+            queryset = queryset.filter(user__profile__height_cm=parse_height_param('height', height))
         if weight:
             queryset = queryset.filter(user__profile__weight=weight)
         if sport:
-            queryset = queryset.filter(user__profile__sport__icontains=sport)
+            queryset = queryset.filter(user__profile__sport_norm__contains=normalize_text(sport))
+        if full_name:
+            # Ranked last, among the requests left by the filters above
+            profiles = UserProfile.objects.filter(user__in=queryset.values('user'))
+            ids = get_search_backend().search(full_name, columns=('full_name', 'username'), queryset=profiles)
+            queryset = ranked(queryset, ids, field='user__profile__id')
         return queryset
 
 
@@ -282,9 +290,19 @@ class VerifiedUsersListView(APIView):
     def get(self, request):
         if request.user.is_superuser or request.user.is_promotion:
             search_query = request.query_params.get('search', '')
-            users = get_list_or_404(CustomUser, is_verified=True, username__icontains=search_query)
-            serializer = VerifiedUserProfileSerializer(users, many=True)
-            return Response(serializer.data)
+            users = CustomUser.objects.filter(
+                is_verified=True, username__icontains=search_query
+            ).select_related('profile').order_by('id')
+            # ?export=jsonl streams every match as JSON Lines instead of returning a page
+            if request.query_params.get('export') == 'jsonl':
+                return json_lines_response(users, VerifiedUserProfileSerializer)
+
+            paginator = SearchPagination()
+            page = paginator.paginate_queryset(users, request, view=self)
+            if not paginator.page.paginator.count:
+                raise Http404
+            serializer = VerifiedUserProfileSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         else:
             return Response({"error": "You do not have permission to view this list."}, status=403)
 
@@ -306,14 +324,49 @@ class RejectVerificationView(APIView):
 class UserSearchListView(generics.ListAPIView):
     serializer_class = VerifiedUserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def list(self, request, *args, **kwargs):
+        ids = self.get_ids()
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        # Only the users of the requested page are loaded, in the cached order
+        page_ids = self.paginate_queryset(ids)
+        users = {user.profile.id: user for user in self.get_users().filter(profile__id__in=page_ids)}
+        page = [users[pk] for pk in page_ids if pk in users]
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def get_users(self):
+        # The serializer renders the profile of every user
+        return CustomUser.objects.filter(is_verified=True).select_related('profile')
+
+    def get_ids(self):
+        if not hasattr(self, '_ids'):
+            self._ids = search_profile_ids(self.get_lookups(), self.request.query_params.get('full_name'))
+        return self._ids
 
     def get_queryset(self):
-        queryset = CustomUser.objects.filter(is_verified=True)
-        queries = []
+        queryset = self.get_users()
+        lookups = self.get_lookups()
+        full_name = self.request.query_params.get('full_name')
+        ids = self.get_ids()
+        if ids is None:
+            # Too many matches to cache as an id list
+            profile_lookups = {f'profile__{lookup}': value for lookup, value in lookups.items()}
+            return queryset.filter(**profile_lookups).order_by('profile__id')
+        if full_name:
+            # Most relevant name matches first
+            return ranked(queryset, ids, field='profile__id')
+        return queryset.filter(profile__id__in=ids).order_by('profile__id')
+
+    def get_lookups(self):
+        # Filters as UserProfile lookups, so the ORM and the fighter index can both run them.
+        # profile.is_verified mirrors the user flag (see accounts.signals) and lets the
+        # verified-only partial indexes on UserProfile serve the filters below
+        lookups = {'is_verified': True}
 
         weight_min = self.request.query_params.get('weight_min')
         weight_max = self.request.query_params.get('weight_max')
-        full_name = self.request.query_params.get('full_name')
         height = self.request.query_params.get('height')
         sport = self.request.query_params.get('sport')
         city = self.request.query_params.get('city')
@@ -321,30 +374,19 @@ class UserSearchListView(generics.ListAPIView):
         rank = self.request.query_params.get('rank')
 
         if weight_min and weight_max:
-            weight_min = int(weight_min)
-            weight_max = int(weight_max)
-            queries.append(Q(profile__weight__gte=weight_min) & Q(profile__weight__lte=weight_max))
-        if full_name:
-            queries.append(Q(profile__full_name__icontains=full_name))
+            lookups['weight__gte'] = int(weight_min)
+            lookups['weight__lte'] = int(weight_max)
         if height:
-            queries.append(Q(profile__height=height))
+            lookups['height_cm'] = parse_height_param('height', height)
         if sport:
-            queries.append(Q(profile__sport__icontains=sport))
+            lookups['sport_norm__contains'] = normalize_text(sport)
         if city:
-            queries.append(Q(profile__city__icontains=city))
+            lookups['city_norm__contains'] = normalize_text(city)
         if sport_time:
-            queries.append(Q(profile__sport_time=sport_time))
+            lookups['sport_time'] = sport_time
         if rank is not None:
-            rank_value = rank.lower() in ['true', '1', 't', 'y', 'yes']
-            queries.append(Q(profile__rank=rank_value))
-
-        if queries:
-            query = queries.pop()
-            for item in queries:
-                query &= item
-            queryset = queryset.filter(query)
-
-        return queryset
+            lookups['rank'] = rank.lower() in ['true', '1', 't', 'y', 'yes']
+        return lookups
 
 
 class DeleteUserView(APIView):
@@ -432,7 +474,8 @@ class FavouriteListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Favourite.objects.filter(user=self.request.user)
+        # Every favourite renders the full profile, fight stats included
+        return Favourite.objects.filter(user=self.request.user).select_related('favourite_profile__stats')
 
 
 class SubStatusCreateUpdateView(generics.CreateAPIView, generics.UpdateAPIView):
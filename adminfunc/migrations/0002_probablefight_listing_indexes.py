@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminfunc', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='probablefight',
+            index=models.Index(fields=['promotion_name', 'created_at'], name='probable_fight_promotion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='probablefight',
+            index=models.Index(fields=['weight_category', 'created_at'], name='probable_fight_weight_idx'),
+        ),
+    ]
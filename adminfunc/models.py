@@ -11,5 +11,12 @@ class ProbableFight(models.Model):
     weight_category = models.IntegerField()  # Store the weight in kg
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Listings are newest first, optionally narrowed to one promotion or weight category
+        indexes = [
+            models.Index(fields=['promotion_name', 'created_at'], name='probable_fight_promotion_idx'),
+            models.Index(fields=['weight_category', 'created_at'], name='probable_fight_weight_idx'),
+        ]
+
     def __str__(self):
         return f"{self.fighter1.username} vs {self.fighter2.username} - {self.promotion_name}"
\ No newline at end of file
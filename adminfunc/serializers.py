@@ -1,10 +1,36 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from accounts.models import CustomUser
 from adminfunc.models import ProbableFight
+from core.cache import bump_generation, HOME_PROBABLE_FIGHTS
 from profiles.serializers import VerifiedUserProfileSerializer
 
 
+class ProbableFightListSerializer(serializers.ListSerializer):
+    """
+    Creates a whole fight card at once: the fighters of every row are loaded with a single
+    query before the rows are validated, and the valid card is inserted with one bulk_create.
+    Errors are reported per row, in the order the rows were sent.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            usernames = {row.get(field) for row in data if isinstance(row, dict)
+                         for field in ('fighter1_username', 'fighter2_username')}
+            usernames = {username for username in usernames if isinstance(username, str)}
+            self.context['fighters'] = CustomUser.objects.select_related('profile').in_bulk(
+                usernames, field_name='username')
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            fights = ProbableFight.objects.bulk_create(ProbableFight(**row) for row in validated_data)
+        # bulk_create sends no post_save, so core.signals doesn't see these
+        bump_generation(HOME_PROBABLE_FIGHTS)
+        return fights
+
+
 class ProbableFightSerializer(serializers.ModelSerializer):
     fighter1_username = serializers.CharField(write_only=True)
     fighter2_username = serializers.CharField(write_only=True)
@@ -16,13 +42,21 @@ class ProbableFightSerializer(serializers.ModelSerializer):
         fields = ['id', 'fighter1_username', 'fighter2_username', 'fighter1_details',
                   'fighter2_details', 'promotion_name', 'weight_category', 'created_at']
         read_only_fields = ['created_at']
+        list_serializer_class = ProbableFightListSerializer
+
+    def get_fighters(self, usernames):
+        # Preloaded by ProbableFightListSerializer for bulk creation, one query otherwise
+        fighters = self.context.get('fighters')
+        if fighters is None:
+            fighters = CustomUser.objects.in_bulk(usernames, field_name='username')
+        return fighters
 
     def validate(self, data):
         # Get fighters by username
-        try:
-            fighter1 = CustomUser.objects.get(username=data['fighter1_username'])
-            fighter2 = CustomUser.objects.get(username=data['fighter2_username'])
-        except CustomUser.DoesNotExist:
+        fighters = self.get_fighters({data['fighter1_username'], data['fighter2_username']})
+        fighter1 = fighters.get(data['fighter1_username'])
+        fighter2 = fighters.get(data['fighter2_username'])
+        if fighter1 is None or fighter2 is None:
             raise serializers.ValidationError("One or both fighters not found")
 
         # Check if both fighters are verified
@@ -1,12 +1,13 @@
 from django.urls import path, re_path
 
 from profiles.views import UnapprovedFightRecordListView
-from .views import ProbableFightView, ApproveFightRecordView, ProbableFightUpdateView
+from .views import ProbableFightView, ApproveFightRecordView, ProbableFightUpdateView, ProbableFightBulkCreateView
 
 app_name = 'news'
 
 urlpatterns = [
     path('probable-fights/', ProbableFightView.as_view(), name='probable-fights'),
+    path('probable-fights/bulk/', ProbableFightBulkCreateView.as_view(), name='probable-fights-bulk'),
     path('probable-fights/<int:id>/', ProbableFightView.as_view(), name='probable-fight-detail'),
     path('probable-fights/<int:id>/update/', ProbableFightUpdateView.as_view(), name='probable-fight-update'),
 
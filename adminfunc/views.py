@@ -1,22 +1,38 @@
+from django.db import transaction
 from django.shortcuts import render
 from rest_framework import generics
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAdminUser
 from profiles.models import FightRecord
+from profiles.ratings import apply_record
 from profiles.serializers import FightRecordSerializer
 from .models import ProbableFight
 from .serializers import ProbableFightSerializer
 from rest_framework.response import Response
 from rest_framework import generics, status
+from core.pagination import KeysetPagination
 
 # Create your views here.
 class ProbableFightView(generics.ListCreateAPIView, generics.DestroyAPIView):
     serializer_class = ProbableFightSerializer
     permission_classes = [IsAdminUser]
     lookup_field = 'id'
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return ProbableFight.objects.all().order_by('-created_at')
+        # Both fighters and their profiles are rendered, so they are joined in the same query
+        fights = ProbableFight.objects.select_related('fighter1__profile', 'fighter2__profile')
+
+        # ?promotion= and ?weight_category= are exact matches, backed by the model's indexes
+        params = self.request.query_params
+        if params.get('promotion'):
+            fights = fights.filter(promotion_name=params['promotion'])
+        if params.get('weight_category'):
+            try:
+                fights = fights.filter(weight_category=int(params['weight_category']))
+            except ValueError:
+                raise ValidationError({'weight_category': "Expected a weight in kg."})
+        return fights.order_by('-created_at', '-id')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -29,10 +45,25 @@ class ProbableFightView(generics.ListCreateAPIView, generics.DestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ProbableFightBulkCreateView(generics.CreateAPIView):
+    """
+    Creates a list of fights (a promotion's card) in one transaction; nothing is created
+    unless every row is valid.
+    """
+    serializer_class = ProbableFightSerializer
+    permission_classes = [IsAdminUser]
+    # Bouts accepted per request, a full card with room to spare
+    max_fights = 50
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(many=True, allow_empty=False, max_length=self.max_fights)
+        return super().get_serializer(*args, **kwargs)
+
+
 class ProbableFightUpdateView(generics.UpdateAPIView):
     serializer_class = ProbableFightSerializer
     permission_classes = [IsAdminUser]
-    queryset = ProbableFight.objects.all()
+    queryset = ProbableFight.objects.select_related('fighter1__profile', 'fighter2__profile')
     lookup_field = 'id'
 
     def get_serializer_context(self):
@@ -68,8 +99,11 @@ class ApproveFightRecordView(generics.UpdateAPIView):
 
     def update(self, request, *args, **kwargs):
         fight_record = self.get_object()
-        fight_record.is_approved = True
-        fight_record.save()
+        # The approval and the rating change it causes are committed together or not at all
+        with transaction.atomic():
+            fight_record.is_approved = True
+            fight_record.save()
+            apply_record(fight_record)
         serializer = self.get_serializer(fight_record)
         return Response(serializer.data)
 
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Independently invalidated sections of the /api/home/ payload
+HOME_POSTS = 'home:posts'
+HOME_NEWS = 'home:news'
+HOME_FIGHTERS = 'home:fighters'
+HOME_PROBABLE_FIGHTS = 'home:probable_fights'
+# Ordered profile id lists of the search endpoints, see core.search.search_profile_ids
+SEARCH_RESULTS = 'search:results'
+
+
+def _generation_key(namespace):
+    return f'generation:{namespace}'
+
+
+def get_generation(namespace):
+    """
+    Returns the current generation of a cache namespace. Every cached entry
+    embeds the generation in its key, so bumping it invalidates the whole
+    namespace at once without having to know which keys were written.
+    """
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(*namespaces):
+    # A timestamp instead of incr() so an evicted counter never restarts at an old value
+    for namespace in namespaces:
+        cache.set(_generation_key(namespace), time.time_ns(), None)
+
+
+def get_or_build(namespace, suffix, builder, timeout=None):
+    """
+    Returns the cached value for `suffix` in the namespace's current generation,
+    calling `builder()` and storing its result on a miss. A None result is not stored.
+    """
+    key = f'{namespace}:{get_generation(namespace)}:{suffix}'
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        if value is not None:
+            cache.set(key, value, settings.HOME_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def _home_post_ids_key():
+    return f'{HOME_POSTS}:{get_generation(HOME_POSTS)}:post_ids'
+
+
+def set_home_post_ids(ids):
+    # Posts on the cached first page, so likes and comments elsewhere don't invalidate it
+    cache.set(_home_post_ids_key(), set(ids), settings.HOME_CACHE_TIMEOUT)
+
+
+def get_home_post_ids():
+    # None when unknown, in which case any post may be on the cached page
+    return cache.get(_home_post_ids_key())
+
+
+@contextmanager
+def cache_lock(name, timeout=10):
+    """
+    Best-effort mutex shared by every process using the cache, for read-modify-write updates
+    of a cached value. Yields whether the lock was acquired; callers don't wait for it but
+    drop the cached value instead, so it is rebuilt on next read rather than losing an update.
+    """
+    key = f'lock:{name}'
+    acquired = cache.add(key, True, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(key)
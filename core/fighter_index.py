@@ -0,0 +1,358 @@
+import bisect
+import datetime
+import operator
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import UserProfile
+
+FIGHTER_INDEX = 'fighter_index'
+
+# Stored for missing numbers; every indexed number is otherwise >= 0
+NULL = -1
+MAX_NUMBER = 2 ** 63 - 1
+INFINITY = float('inf')
+# A candidate list is intersected with the current set when at most this many times longer,
+# otherwise its predicate is checked on the (smaller) set instead
+INTERSECT_RATIO = 8
+
+# Indexed UserProfile attributes (wins/losses come from FightStats), by storage kind
+NUMBER_COLUMNS = ('id', 'weight', 'height_cm', 'birth_date', 'wins', 'losses')
+CATEGORY_COLUMNS = ('sport_norm', 'city_norm', 'status_norm', 'country', 'sport_time')
+FLAG_COLUMNS = ('is_verified', 'rank')
+# Numbers kept in value order as well, so range lookups are a bisect instead of a scan
+RANGE_COLUMNS = ('weight', 'height_cm', 'birth_date')
+
+SOURCE_FIELDS = {
+    'wins': 'stats__wins',
+    'losses': 'stats__losses',
+}
+
+COMPARISONS = {
+    'exact': operator.eq,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+}
+
+
+def _number(value):
+    if value is None:
+        return NULL
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    return int(value)
+
+
+class FighterIndex:
+    """
+    Process-local columnar copy of the profile attributes used by the search filters.
+
+    Every profile occupies a slot in one `array` per column; categories are stored as
+    integer codes and flags as bytes. Range columns are additionally kept sorted with
+    their slots, and every category/flag value has a posting list of its slots, so
+    filter() starts from the narrowest of those candidate lists and only checks the
+    remaining lookups on that subset.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.columns = {column: array('q') for column in NUMBER_COLUMNS}
+        self.columns.update({column: array('i') for column in CATEGORY_COLUMNS})
+        self.columns.update({column: array('b') for column in FLAG_COLUMNS})
+        # Category value -> code and back; None and '' share code 0
+        self.codes = {column: {None: 0, '': 0} for column in CATEGORY_COLUMNS}
+        self.labels = {column: [''] for column in CATEGORY_COLUMNS}
+        # Range column -> (sorted values, slot of each value)
+        self.sorted = {column: (array('q'), array('q')) for column in RANGE_COLUMNS}
+        # Category code / flag -> slots holding it
+        self.postings = {column: {} for column in CATEGORY_COLUMNS + FLAG_COLUMNS}
+        # Profile id -> slot, NULL for profiles not in the index
+        self.slot_of = array('q')
+        self.free_slots = []
+
+    @classmethod
+    def build(cls, queryset=None):
+        index = cls()
+        for row in cls.rows(UserProfile.objects.all() if queryset is None else queryset):
+            index._append(row)
+        index._sort_ranges()
+        return index
+
+    @staticmethod
+    def rows(queryset):
+        fields = [SOURCE_FIELDS.get(column, column) for column in NUMBER_COLUMNS + CATEGORY_COLUMNS + FLAG_COLUMNS]
+        names = NUMBER_COLUMNS + CATEGORY_COLUMNS + FLAG_COLUMNS
+        for values in queryset.values_list(*fields).iterator(chunk_size=5000):
+            yield dict(zip(names, values))
+
+    def __len__(self):
+        return sum(1 for slot in self.slot_of if slot != NULL)
+
+    def _code(self, column, value):
+        codes = self.codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.labels[column])
+            self.labels[column].append(value)
+        return code
+
+    def _encode(self, row):
+        values = {column: _number(row[column]) for column in NUMBER_COLUMNS}
+        values.update({column: self._code(column, row[column]) for column in CATEGORY_COLUMNS})
+        values.update({column: int(bool(row[column])) for column in FLAG_COLUMNS})
+        return values
+
+    def _set_slot(self, profile_id, slot):
+        if profile_id >= len(self.slot_of):
+            self.slot_of.extend(array('q', [NULL]) * (profile_id + 1 - len(self.slot_of)))
+        self.slot_of[profile_id] = slot
+
+    def _append(self, row):
+        # Bulk loading only: range columns are sorted once everything is in
+        slot = len(self.columns['id'])
+        for column, value in self._encode(row).items():
+            self.columns[column].append(value)
+            if column in self.postings:
+                self.postings[column].setdefault(value, array('q')).append(slot)
+        self._set_slot(row['id'], slot)
+
+    def _sort_ranges(self):
+        ids = self.columns['id']
+        for column in RANGE_COLUMNS:
+            values = self.columns[column]
+            slots = sorted((slot for slot in range(len(ids)) if ids[slot] != NULL), key=values.__getitem__)
+            self.sorted[column] = (array('q', (values[slot] for slot in slots)), array('q', slots))
+
+    def upsert(self, row):
+        with self.lock:
+            self.remove(row['id'])
+            slot = self.free_slots.pop() if self.free_slots else len(self.columns['id'])
+            for column, value in self._encode(row).items():
+                if slot == len(self.columns[column]):
+                    self.columns[column].append(value)
+                else:
+                    self.columns[column][slot] = value
+                if column in self.postings:
+                    self.postings[column].setdefault(value, array('q')).append(slot)
+                if column in self.sorted:
+                    values, slots = self.sorted[column]
+                    position = bisect.bisect_right(values, value)
+                    values.insert(position, value)
+                    slots.insert(position, slot)
+            self._set_slot(row['id'], slot)
+
+    def remove(self, profile_id):
+        with self.lock:
+            if profile_id >= len(self.slot_of) or self.slot_of[profile_id] == NULL:
+                return
+            slot = self.slot_of[profile_id]
+            for column, postings in self.postings.items():
+                slots = postings[self.columns[column][slot]]
+                slots.pop(slots.index(slot))
+            for column, (values, slots) in self.sorted.items():
+                value = self.columns[column][slot]
+                position = slots.index(slot, bisect.bisect_left(values, value), bisect.bisect_right(values, value))
+                values.pop(position)
+                slots.pop(position)
+            self.columns['id'][slot] = NULL
+            self.slot_of[profile_id] = NULL
+            self.free_slots.append(slot)
+
+    @staticmethod
+    def _parse(lookup):
+        # "stats__wins__gte" -> ("wins", "gte")
+        for column, field in SOURCE_FIELDS.items():
+            if lookup == field or lookup.startswith(f'{field}__'):
+                lookup = column + lookup[len(field):]
+        column, _, kind = lookup.partition('__')
+        return column, kind or 'exact'
+
+    def _lookup(self, column, kind, value):
+        """
+        Compiles one lookup into (candidate slots or None, predicate). The candidates hold
+        exactly the matching slots; None means the predicate has to be checked on every slot.
+        """
+        stored = self.columns[column]
+
+        if kind == 'isnull':
+            empty = 0 if column in CATEGORY_COLUMNS else NULL
+            return None, lambda slot: (stored[slot] == empty) == bool(value)
+
+        if column in CATEGORY_COLUMNS:
+            if kind == 'exact':
+                codes = {self.codes[column].get(value, -1)}
+            elif kind == 'in':
+                codes = {self.codes[column].get(item, -1) for item in value}
+            elif kind == 'contains':
+                codes = {code for code, label in enumerate(self.labels[column]) if label and value in label}
+            else:
+                raise ValueError(f"Unsupported lookup {column}__{kind}.")
+            codes.discard(-1)
+            postings = self.postings[column]
+            candidates = [slot for code in codes for slot in postings.get(code, ())]
+            return candidates, lambda slot: stored[slot] in codes
+
+        if column in FLAG_COLUMNS:
+            if kind != 'exact':
+                raise ValueError(f"Unsupported lookup {column}__{kind}.")
+            flag = int(bool(value))
+            return self.postings[column].get(flag, ()), lambda slot: stored[slot] == flag
+
+        if kind == 'in':
+            numbers = {_number(item) for item in value}
+            return None, lambda slot: stored[slot] in numbers
+        if kind not in COMPARISONS:
+            raise ValueError(f"Unsupported lookup {column}__{kind}.")
+        compare, number = COMPARISONS[kind], _number(value)
+        return None, lambda slot: stored[slot] != NULL and compare(stored[slot], number)
+
+    def _range(self, column, low, high):
+        # Slots whose value lies in [low, high], straight from the sorted copy of the column
+        values, slots = self.sorted[column]
+        start, stop = bisect.bisect_left(values, low), bisect.bisect_right(values, high)
+        stored = self.columns[column]
+        return slots[start:stop] if start < stop else (), lambda slot: low <= stored[slot] <= high
+
+    def filter(self, order_by='id', **lookups):
+        """
+        Ids of the profiles matching every lookup, ordered by `order_by` ("weight",
+        "-birth_date", ...). Lookups are the UserProfile ones the ORM query would use.
+        """
+        with self.lock:
+            # Comparisons on a range column collapse into one inclusive [low, high] interval;
+            # all stored numbers are integers and NULL sorts below 0
+            bounds, sources = {}, []
+            for lookup, value in lookups.items():
+                column, kind = self._parse(lookup)
+                if column not in self.columns:
+                    raise ValueError(f"{column} is not in the fighter index.")
+                if column in self.sorted and kind in COMPARISONS:
+                    low, high = bounds.get(column, (0, MAX_NUMBER))
+                    number = _number(value)
+                    if kind in ('exact', 'gte', 'gt'):
+                        low = max(low, number + (kind == 'gt'))
+                    if kind in ('exact', 'lte', 'lt'):
+                        high = min(high, number - (kind == 'lt'))
+                    bounds[column] = (low, high)
+                else:
+                    sources.append(self._lookup(column, kind, value))
+            sources.extend(self._range(column, low, high) for column, (low, high) in bounds.items())
+
+            # Start from the narrowest candidate list, intersect it (in C) with the other lists
+            # that are not much longer, and check the remaining predicates on what is left
+            ids = self.columns['id']
+            sources.sort(key=lambda source: INFINITY if source[0] is None else len(source[0]))
+            if sources and sources[0][0] is not None:
+                slots = set(sources.pop(0)[0])
+                while sources and sources[0][0] is not None and len(sources[0][0]) <= INTERSECT_RATIO * len(slots):
+                    slots.intersection_update(sources.pop(0)[0])
+                slots = list(slots)
+            else:
+                slots = [slot for slot in range(len(ids)) if ids[slot] != NULL]
+            for _, predicate in sources:
+                slots = [slot for slot in slots if predicate(slot)]
+
+            column = order_by.lstrip('-')
+            slots.sort(key=self.columns[column].__getitem__, reverse=order_by.startswith('-'))
+            return [ids[slot] for slot in slots]
+
+
+_index = None
+_sequence = None
+_lock = threading.Lock()
+
+# Every profile change gets the next number of a shared sequence and a changelog key holding
+# the changed profile id, so a process only reloads the profiles changed since its own copy
+_SEQUENCE_KEY = f'{FIGHTER_INDEX}:sequence'
+# A process further behind than this rebuilds instead of replaying the changelog
+MAX_REPLAYED_CHANGES = 1000
+
+
+def _change_key(sequence):
+    return f'{FIGHTER_INDEX}:change:{sequence}'
+
+
+def _current_sequence():
+    # Starts from a timestamp, so a sequence that was evicted restarts above every old value
+    cache.add(_SEQUENCE_KEY, time.time_ns(), None)
+    return cache.get(_SEQUENCE_KEY)
+
+
+def _record_change(profile_id):
+    _current_sequence()
+    try:
+        sequence = cache.incr(_SEQUENCE_KEY)
+    except ValueError:
+        # Evicted between the two calls
+        _current_sequence()
+        sequence = cache.incr(_SEQUENCE_KEY)
+    cache.set(_change_key(sequence), profile_id, settings.FIGHTER_INDEX_CHANGELOG_TIMEOUT)
+
+
+def _apply_changes(index, profile_ids):
+    rows = {row['id']: row for row in FighterIndex.rows(UserProfile.objects.filter(pk__in=profile_ids))}
+    for profile_id in profile_ids:
+        if profile_id in rows:
+            index.upsert(rows[profile_id])
+        else:
+            index.remove(profile_id)
+
+
+def is_enabled():
+    return settings.FIGHTER_INDEX_ENABLED
+
+
+def get_fighter_index():
+    """
+    Returns this process' index after applying the profile changes other processes logged
+    since it was last brought up to date. It is rebuilt from scratch only the first time, or
+    when it fell too far behind or part of the changelog has expired.
+    """
+    global _index, _sequence
+    with _lock:
+        sequence = _current_sequence()
+        behind = None if _index is None or _sequence is None or sequence < _sequence else sequence - _sequence
+        if behind == 0:
+            return _index
+        # Checked before listing the changelog keys: a sequence restarted after an eviction
+        # is billions ahead
+        if behind is not None and behind <= MAX_REPLAYED_CHANGES:
+            changes = cache.get_many([_change_key(number) for number in range(_sequence + 1, sequence + 1)])
+            if len(changes) == behind:
+                _apply_changes(_index, set(changes.values()))
+                _sequence = sequence
+                return _index
+        _index, _sequence = FighterIndex.build(), sequence
+        return _index
+
+
+def match_ids(lookups):
+    """
+    Ids of the profiles matching `lookups` from the fighter index, or None when the ORM
+    should run the query instead: the index is disabled, or there are too many matches to
+    hand back to the database as an id list.
+    """
+    if not is_enabled():
+        return None
+    ids = get_fighter_index().filter(**lookups)
+    if len(ids) > settings.FIGHTER_INDEX_MAX_RESULTS:
+        return None
+    return ids
+
+
+def refresh_profile(profile_id):
+    """
+    Logs a profile change for every process' index, this one included; each applies it on its
+    next read. Called from core.signals on profile and fight stats changes, and only once the
+    change is committed so no process reloads the old row.
+    """
+    if not is_enabled():
+        return
+    transaction.on_commit(lambda: _record_change(profile_id))
@@ -0,0 +1,111 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import CustomUser, UserProfile
+from accounts.utils import NORMALIZED_FIELDS, normalize_text, parse_height_cm
+from core.fighter_index import FighterIndex
+from profiles.models import FightStats
+
+SPORTS = ['Boxing', 'MMA', 'Judo', 'Muay Thai', 'Kickboxing', 'Wrestling', 'BJJ', 'Sambo']
+CITIES = ['Almaty', 'Astana', 'Shymkent', 'Karaganda', 'Aktobe', 'Taraz', 'Pavlodar', 'Oskemen',
+          'Semey', 'Atyrau', 'Kostanay', 'Kyzylorda', 'Oral', 'Petropavl', 'Aktau', 'Turkistan']
+STATUSES = [status for status, _ in UserProfile.STATUS_CHOICES]
+
+# Search shapes timed on both paths, as the lookups the search views pass to either
+QUERIES = [
+    ('weight range', {'birth_date__isnull': False, 'weight__gte': 70, 'weight__lte': 72}),
+    ('sport + weight', {'birth_date__isnull': False, 'sport_norm': 'boxing', 'weight__gte': 70, 'weight__lte': 77}),
+    ('city + sport + status', {'birth_date__isnull': False, 'city_norm': 'almaty', 'sport_norm': 'mma',
+                               'status_norm': 'ready to fight'}),
+    ('weight + height + age', {'birth_date__isnull': False, 'weight__gte': 60, 'weight__lte': 70,
+                               'height_cm__gte': 170, 'height_cm__lte': 175,
+                               'birth_date__gte': datetime.date(1995, 1, 1),
+                               'birth_date__lte': datetime.date(2000, 1, 1)}),
+    ('verified matchmaking', {'is_verified': True, 'sport_norm': 'boxing', 'status_norm': 'free',
+                              'weight__gte': 75, 'weight__lte': 80, 'stats__wins__gte': 5}),
+    ('verified city substring', {'is_verified': True, 'city_norm__contains': 'ast', 'rank': True}),
+]
+
+
+class Command(BaseCommand):
+    help = ("Compares the in-memory fighter index against the ORM on synthetic profiles. The "
+            "profiles are created in a transaction that is rolled back, but use a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                random.seed(options['seed'])
+                started = time.perf_counter()
+                self.create_profiles(size)
+                self.stdout.write(f"\n{size} synthetic profiles created in {time.perf_counter() - started:.1f}s")
+                self.benchmark(options['repeat'])
+                transaction.set_rollback(True)
+
+    def create_profiles(self, size, batch_size=5000):
+        first_id = (CustomUser.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        for offset in range(0, size, batch_size):
+            ids = range(first_id + offset, first_id + min(offset + batch_size, size))
+            CustomUser.objects.bulk_create([
+                CustomUser(id=user_id, username=f'benchmark{user_id}', password='!')
+                for user_id in ids
+            ])
+            profiles = [self.synthetic_profile(user_id) for user_id in ids]
+            for profile in profiles:
+                profile.height_cm = parse_height_cm(profile.height)
+                for field, normalized in NORMALIZED_FIELDS.items():
+                    setattr(profile, normalized, normalize_text(getattr(profile, field)))
+            profiles = UserProfile.objects.bulk_create(profiles)
+            FightStats.objects.bulk_create([
+                FightStats(user_profile_id=profile.id, wins=random.randint(0, 30), losses=random.randint(0, 15))
+                for profile in profiles
+            ])
+
+    @staticmethod
+    def synthetic_profile(user_id):
+        return UserProfile(
+            user_id=user_id,
+            username=f'benchmark{user_id}',
+            full_name=f'Benchmark Fighter {user_id}',
+            birth_date=datetime.date(1975, 1, 1) + datetime.timedelta(days=random.randint(0, 11000)),
+            weight=random.randint(48, 130),
+            height=str(random.randint(150, 210)),
+            sport=random.choice(SPORTS),
+            city=random.choice(CITIES),
+            status=random.choice(STATUSES),
+            is_verified=random.random() < 0.6,
+            rank=random.random() < 0.2,
+        )
+
+    def benchmark(self, repeat):
+        started = time.perf_counter()
+        index = FighterIndex.build()
+        self.stdout.write(f"index built in {time.perf_counter() - started:.2f}s")
+        self.stdout.write(f"{'query':<26}{'matches':>9}{'orm ms':>10}{'index ms':>10}{'speedup':>9}")
+        for label, lookups in QUERIES:
+            orm_ids, orm_time = self.timed(repeat, lambda: list(
+                UserProfile.objects.filter(**lookups).order_by('id').values_list('id', flat=True)))
+            index_ids, index_time = self.timed(repeat, lambda: index.filter(**lookups))
+            if orm_ids != index_ids:
+                raise CommandError(f"{label}: the index returned {len(index_ids)} ids, the ORM {len(orm_ids)}.")
+            self.stdout.write(f"{label:<26}{len(orm_ids):>9}{orm_time * 1000:>10.1f}{index_time * 1000:>10.1f}"
+                              f"{orm_time / index_time:>8.1f}x")
+
+    @staticmethod
+    def timed(repeat, run):
+        # Best of `repeat` runs
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
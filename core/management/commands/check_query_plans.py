@@ -0,0 +1,103 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from accounts.views import UserSearchListView, WaitingVerifiedUsersListView
+from adminfunc.views import ProbableFightView
+from core import sampling
+from core.search import profile_ids_queryset
+from core.views import UserProfileSearchAPIView
+from profiles.views import LeaderboardView
+
+
+def _view(view_class, params):
+    view = view_class()
+    view.setup(RequestFactory().get('/', params))
+    view.request = view.initialize_request(view.request)
+    return view
+
+
+def view_queryset(view_class, **params):
+    """
+    Builds the queryset `view_class` would run for a GET with `params`, without executing it.
+    """
+    return lambda: _view(view_class, params).get_queryset()
+
+
+def search_queryset(view_class, **params):
+    # The id query behind a search view's cached results, see core.search.search_profile_ids
+    return lambda: profile_ids_queryset(_view(view_class, params).get_lookups())
+
+
+# Every filter combination the search endpoints are expected to serve from an index. A boolean
+# alone (`rank`) matches about half the table, so it is only checked together with a selective filter.
+SHAPES = [
+    ('search: weight range', search_queryset(UserProfileSearchAPIView, weight_min=60, weight_max=70)),
+    ('search: height range', search_queryset(UserProfileSearchAPIView, height_min=170, height_max=180)),
+    ('search: age range', search_queryset(UserProfileSearchAPIView, age_min=20, age_max=30)),
+    ('search: city', search_queryset(UserProfileSearchAPIView, city='Almaty')),
+    ('search: sport', search_queryset(UserProfileSearchAPIView, sport='Boxing')),
+    ('search: status', search_queryset(UserProfileSearchAPIView, status='Ready to fight')),
+    ('search: city + sport', search_queryset(UserProfileSearchAPIView, city='Almaty', sport='Boxing')),
+    ('search: city + weight', search_queryset(UserProfileSearchAPIView, city='almaty', weight_min=60)),
+    ('search: sport + height', search_queryset(UserProfileSearchAPIView, sport='boxing', height_min=170)),
+    ('search: status + age', search_queryset(UserProfileSearchAPIView, status='free', age_max=30)),
+    ('users: weight range', search_queryset(UserSearchListView, weight_min=60, weight_max=70)),
+    ('users: height', search_queryset(UserSearchListView, height=180)),
+    ('users: sport time', search_queryset(UserSearchListView, sport_time='5 years')),
+    ('users: rank + weight', search_queryset(UserSearchListView, rank='true', weight_min=60, weight_max=70)),
+    ('users: city + weight', search_queryset(UserSearchListView, city='almaty', weight_min=60, weight_max=70)),
+    ('waiting: height', view_queryset(WaitingVerifiedUsersListView, height=180)),
+    ('waiting: weight', view_queryset(WaitingVerifiedUsersListView, weight=70)),
+    ('home: fighter sample index', sampling.index_rows),
+    ('probable fights: promotion', view_queryset(ProbableFightView, promotion='Naiza')),
+    ('probable fights: weight category', view_queryset(ProbableFightView, weight_category=70)),
+    ('leaderboard: wins', view_queryset(LeaderboardView, sport='boxing', weight=70, sort='wins')),
+    ('leaderboard: win rate', view_queryset(LeaderboardView, sport='boxing', weight=70, sort='win_rate')),
+    ('leaderboard: rating', view_queryset(LeaderboardView, sport='boxing', weight=70, sort='rating')),
+]
+
+# Plan lines that mean every row of a table is read
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)\S+'),
+    'postgresql': re.compile(r'\bSeq Scan on \S+'),
+}
+
+
+class Command(BaseCommand):
+    help = ("Runs EXPLAIN QUERY PLAN on every profile search query shape and fails if any of them "
+            "falls back to a full table scan.")
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Query plans can't be checked on {connection.vendor}.")
+
+        failures = []
+        for label, build in SHAPES:
+            plan = self.explain(build())
+            scans = pattern.findall(plan)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{label}\n{plan}\n")
+            if scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {label}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(f"ok         {label}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} of {len(SHAPES)} query shapes fall back to a full table scan.")
+        self.stdout.write(self.style.SUCCESS(f"All {len(SHAPES)} query shapes use an index."))
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Small tables are always cheaper to read sequentially; only ask whether an index is usable
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+                transaction.set_rollback(True)
+            return plan
+        return queryset.explain()
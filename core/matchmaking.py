@@ -0,0 +1,177 @@
+import heapq
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import UserProfile
+from accounts.utils import parse_experience_years
+from core.cache import cache_lock
+
+# Fighters a matchmaker can still book
+AVAILABLE_STATUSES = ('Ready to fight', 'Free')
+
+# Feature -> (difference worth one unit of distance, weight of the feature). Age is compared
+# through birth dates, so its unit is days.
+FEATURES = {
+    'weight': (2, 3.0),
+    'height': (5, 1.0),
+    'age': (3 * 365.25, 1.0),
+    'experience': (2, 1.0),
+    'fights': (5, 1.0),
+    'win_rate': (0.2, 1.5),
+}
+# A feature missing on either side counts as this many units apart
+MISSING_DISTANCE = 1.0
+
+ROW_FIELDS = ('id', 'weight', 'height_cm', 'birth_date', 'sport_time', 'sport_norm',
+              'stats__wins', 'stats__losses', 'stats__draws')
+
+# Weight classes holding at least one candidate; present once the index has been built
+_CLASSES_KEY = 'matchmaking:classes'
+
+
+def _class_key(weight_class):
+    return f'matchmaking:class:{weight_class}'
+
+
+def _member_key(profile_id):
+    # Weight class the profile is currently indexed in
+    return f'matchmaking:member:{profile_id}'
+
+
+def weight_class(weight):
+    return int(weight) // settings.MATCHMAKING_WEIGHT_CLASS_KG
+
+
+def candidate_rows():
+    """
+    The profiles offered as opponents, with everything the distance needs, in one query.
+    """
+    return (UserProfile.objects
+            .filter(is_verified=True, status__in=AVAILABLE_STATUSES, weight__isnull=False)
+            .values(*ROW_FIELDS))
+
+
+def features(row):
+    """
+    Turns a ROW_FIELDS row into the tuple kept in the index: the id, one value per FEATURES
+    entry in order, then the normalized sport.
+    """
+    wins, losses, draws = row['stats__wins'] or 0, row['stats__losses'] or 0, row['stats__draws'] or 0
+    fights = wins + losses + draws
+    return (
+        row['id'],
+        row['weight'],
+        row['height_cm'],
+        row['birth_date'].toordinal() if row['birth_date'] else None,
+        parse_experience_years(row['sport_time']),
+        fights,
+        wins / fights if fights else None,
+        row['sport_norm'],
+    )
+
+
+def distance(fighter, candidate):
+    total = 0.0
+    for position, (unit, weight) in enumerate(FEATURES.values(), start=1):
+        a, b = fighter[position], candidate[position]
+        units = MISSING_DISTANCE if a is None or b is None else (a - b) / unit
+        total += weight * units * units
+    return math.sqrt(total)
+
+
+def build_index():
+    """
+    Rebuilds every weight class from a single query and returns {class: {profile id: features}}.
+    """
+    index, members = {}, {}
+    for row in candidate_rows().iterator(chunk_size=2000):
+        members[_member_key(row['id'])] = weight_class(row['weight'])
+        index.setdefault(weight_class(row['weight']), {})[row['id']] = features(row)
+
+    cache.set_many({_class_key(number): candidates for number, candidates in index.items()},
+                   settings.MATCHMAKING_INDEX_TIMEOUT)
+    # Only ever read next to a class key, which says whether the entry is still current
+    cache.set_many(members, None)
+    # Written last: its presence means the classes above are complete
+    cache.set(_CLASSES_KEY, set(index), settings.MATCHMAKING_INDEX_TIMEOUT)
+    return index
+
+
+def get_candidates(classes):
+    keys = {_class_key(number): number for number in classes}
+    found = cache.get_many([_CLASSES_KEY, *keys])
+    built = found.get(_CLASSES_KEY)
+    if built is None or any(number in built and key not in found for key, number in keys.items()):
+        index = build_index()
+        return [candidate for number in classes for candidate in index.get(number, {}).values()]
+    return [candidate for key in keys for candidate in found.get(key, {}).values()]
+
+
+def _invalidate():
+    # Dropping the class list makes the next read rebuild the whole index
+    cache.delete(_CLASSES_KEY)
+
+
+def update_profile(profile_id):
+    """
+    Moves a single profile to the weight class matching its current weight, status and
+    record, or drops it from the index, touching only its own key and the (at most two)
+    classes involved. Called from core.signals on profile and fight stats changes. Nothing
+    is done while the index is not cached; it is rebuilt on next read.
+    """
+    if cache.get(_CLASSES_KEY) is None:
+        return
+    rows = list(candidate_rows().filter(pk=profile_id))
+    target = weight_class(rows[0]['weight']) if rows else None
+
+    with cache_lock('matchmaking') as locked:
+        classes = cache.get(_CLASSES_KEY)
+        if not locked or classes is None:
+            # A concurrent update could be lost, so the index is rebuilt instead
+            _invalidate()
+            return
+        previous = cache.get(_member_key(profile_id))
+        involved = {number for number in (previous, target) if number is not None}
+        current = cache.get_many([_class_key(number) for number in involved])
+        if any(number in classes and _class_key(number) not in current for number in involved):
+            # A non-empty class was evicted on its own
+            _invalidate()
+            return
+
+        changed = {}
+        if previous is not None:
+            candidates = current.get(_class_key(previous), {})
+            candidates.pop(profile_id, None)
+            changed[_class_key(previous)] = candidates
+        if target is not None:
+            candidates = changed.get(_class_key(target), current.get(_class_key(target), {}))
+            candidates[profile_id] = features(rows[0])
+            changed[_class_key(target)] = candidates
+            cache.set(_member_key(profile_id), target, None)
+        else:
+            cache.delete(_member_key(profile_id))
+        cache.set_many(changed, settings.MATCHMAKING_INDEX_TIMEOUT)
+        if target is not None and target not in classes:
+            classes.add(target)
+            cache.set(_CLASSES_KEY, classes, settings.MATCHMAKING_INDEX_TIMEOUT)
+
+
+def suggest_opponents(profile, k):
+    """
+    Up to k (distance, profile id) pairs of the available fighters nearest to `profile`, taken
+    from its weight class and the two next to it, restricted to the same sport when it has one.
+    """
+    if profile.weight is None:
+        return []
+    fighter = features(UserProfile.objects.values(*ROW_FIELDS).get(pk=profile.pk))
+    sport = fighter[-1]
+    number = weight_class(profile.weight)
+    # A profile whose member key was evicted can linger in its old class as well; the
+    # closer copy wins
+    scored = {}
+    for candidate in get_candidates([number - 1, number, number + 1]):
+        if candidate[0] != profile.pk and (not sport or candidate[-1] == sport):
+            scored[candidate[0]] = min(distance(fighter, candidate), scored.get(candidate[0], math.inf))
+    return heapq.nsmallest(k, ((score, profile_id) for profile_id, score in scored.items()))
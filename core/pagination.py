@@ -0,0 +1,203 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination over (created_at, id).
+
+    Each page is fetched with a `WHERE (created_at, id) < cursor` condition instead of an
+    OFFSET, so deep pages cost the same as the first one, no COUNT(*) is needed and rows
+    inserted while a client is scrolling don't shift items between pages. The cursor is
+    an opaque base64 token holding the boundary row and the direction.
+    """
+    page_size = 10
+    max_page_size = 50
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    ordering_field = 'created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        reverse = bool(position and position['r'])
+        if position:
+            value, pk = position['c'], position['i']
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.ordering_field}__{lookup}': value}) |
+                Q(**{self.ordering_field: value, f'pk__{lookup}': pk})
+            )
+
+        if reverse:
+            queryset = queryset.order_by(self.ordering_field, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{self.ordering_field}', '-pk')
+
+        # One extra row tells whether there is anything beyond this page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position['c'] = self.parse_cursor_value(position['c'])
+            position['i'] = int(position['i'])
+            position['r'] = bool(position['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if position['c'] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def parse_cursor_value(self, value):
+        return parse_datetime(value)
+
+    def cursor_value(self, obj):
+        return getattr(obj, self.ordering_field).isoformat()
+
+    def encode_cursor(self, obj, reverse):
+        position = {
+            'c': self.cursor_value(obj),
+            'i': obj.pk,
+            'r': int(reverse),
+        }
+        encoded = urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_pagination_data(self):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+
+    def get_paginated_response(self, data):
+        return Response({**self.get_pagination_data(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Cursor pagination for tables without a creation timestamp, newest rows first.
+    The primary key is unique, so the cursor never needs an offset.
+    """
+    ordering = '-id'
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+
+class LeaderboardPagination(KeysetPagination):
+    """
+    Keyset pagination over (score, pk), highest score first, where the score is the column
+    the view sorts by (`view.sort_field`). A page is one index range read however deep it is.
+    """
+    page_size = 20
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering_field = view.sort_field
+        return super().paginate_queryset(queryset, request, view)
+
+    def parse_cursor_value(self, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(value)
+        return value
+
+    def cursor_value(self, obj):
+        return getattr(obj, self.ordering_field)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page numbers for search results, which are ordered by relevance or id rather than by
+    time. Paginates querysets as well as the cached id lists of core.search, in which case
+    only the ids of the requested page need to be loaded.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+
+def json_lines_response(queryset, serializer_class, context=None, chunk_size=None):
+    """
+    Streams every row of `queryset` as one JSON document per line. Rows are read with
+    .iterator() and serialized a chunk at a time, so memory use doesn't grow with the size
+    of the export and list serializers can still batch their per-page lookups.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+    def lines():
+        chunk = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(instance)
+            if len(chunk) == chunk_size:
+                yield from _json_lines(serializer_class, chunk, context)
+                chunk = []
+        if chunk:
+            yield from _json_lines(serializer_class, chunk, context)
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
+def _json_lines(serializer_class, instances, context):
+    for item in serializer_class(instances, many=True, context=context or {}).data:
+        yield json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
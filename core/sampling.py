@@ -0,0 +1,110 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Value, When
+
+from accounts.models import CustomUser, UserProfile
+from core.cache import cache_lock
+
+# Home page fighter buckets: name -> (min weight, max weight or None for open-ended)
+WEIGHT_BUCKETS = {
+    'users_0_65': (0, 145),
+    'users_66_93': (146, 170),
+    'users_94_120': (171, None),
+}
+
+
+def _bucket_key(bucket):
+    return f'fighter_sample_index:{bucket}'
+
+
+def _bucket_for(weight):
+    if weight is None:
+        return None
+    for bucket, (min_weight, max_weight) in WEIGHT_BUCKETS.items():
+        if weight >= min_weight and (max_weight is None or weight <= max_weight):
+            return bucket
+    return None
+
+
+def index_rows():
+    # Served entirely by the verified (weight, user) partial index on UserProfile
+    return UserProfile.objects.filter(
+        is_verified=True,
+        weight__isnull=False
+    ).values_list('user_id', 'weight')
+
+
+def weight_bucket_expression(field='weight'):
+    # SQL counterpart of _bucket_for(), '' for profiles without a weight
+    whens = []
+    for bucket, (min_weight, max_weight) in WEIGHT_BUCKETS.items():
+        bounds = {f'{field}__gte': min_weight}
+        if max_weight is not None:
+            bounds[f'{field}__lte'] = max_weight
+        whens.append(When(**bounds, then=Value(bucket)))
+    return Case(*whens, default=Value(''), output_field=CharField())
+
+
+def build_index():
+    """
+    Rebuilds the user ids of every bucket from a single values_list() query
+    and returns them.
+    """
+    index = {bucket: [] for bucket in WEIGHT_BUCKETS}
+    for user_id, weight in index_rows().iterator():
+        bucket = _bucket_for(weight)
+        if bucket:
+            index[bucket].append(user_id)
+
+    cache.set_many({_bucket_key(bucket): ids for bucket, ids in index.items()},
+                   settings.FIGHTER_SAMPLE_INDEX_TIMEOUT)
+    return index
+
+
+def get_bucket_ids(bucket):
+    ids = cache.get(_bucket_key(bucket))
+    if ids is None:
+        ids = build_index()[bucket]
+    return ids
+
+
+def update_profile(profile, deleted=False):
+    """
+    Moves a single profile to the bucket matching its current weight and
+    verification, or drops it from the index. Buckets that are not cached yet
+    are left alone; they are rebuilt from the database on next read.
+    """
+    target = None if deleted or not profile.is_verified else _bucket_for(profile.weight)
+    keys = {_bucket_key(bucket): bucket for bucket in WEIGHT_BUCKETS}
+    with cache_lock('fighter_sample_index') as locked:
+        if not locked:
+            # A concurrent update could be lost, so the buckets are rebuilt on next read instead
+            cache.delete_many(keys.keys())
+            return
+        changed = {}
+        for key, ids in cache.get_many(keys.keys()).items():
+            in_bucket = profile.user_id in ids
+            should_be = keys[key] == target
+            if in_bucket and not should_be:
+                ids.remove(profile.user_id)
+                changed[key] = ids
+            elif should_be and not in_bucket:
+                ids.append(profile.user_id)
+                changed[key] = ids
+        if changed:
+            cache.set_many(changed, settings.FIGHTER_SAMPLE_INDEX_TIMEOUT)
+
+
+def sample_fighters(bucket, k):
+    """
+    Picks up to k random verified users from the bucket and loads only those
+    rows, with their profile, in one query.
+    """
+    ids = get_bucket_ids(bucket)
+    chosen = random.sample(ids, min(len(ids), k))
+    if not chosen:
+        return []
+    users = CustomUser.objects.filter(id__in=chosen).select_related('profile').in_bulk()
+    return [users[user_id] for user_id in chosen if user_id in users]
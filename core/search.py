@@ -0,0 +1,209 @@
+import hashlib
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, Min, When, Q
+from django.utils.module_loading import import_string
+
+from accounts.models import UserProfile
+from core import fighter_index
+from core.cache import SEARCH_RESULTS, get_or_build
+from core.sampling import weight_bucket_expression
+
+SEARCH_TABLE = 'accounts_userprofile_search'
+# Indexed profile columns, in the order they are declared in the FTS table
+SEARCH_COLUMNS = ('full_name', 'username', 'city', 'sport')
+# Relevance weight of each column for bm25(), a match in the name counts the most
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+# Facets of the profile search: name -> (grouped column, column the display label comes from)
+FACETS = {
+    'sport': ('sport_norm', 'sport'),
+    'city': ('city_norm', 'city'),
+    'status': ('status_norm', 'status'),
+    'weight': ('weight_bucket', None),
+}
+
+
+class BaseSearchBackend:
+    """
+    Interface of a fighter search index. search() returns matching profile ids, most
+    relevant first; the index is kept current through index()/remove() from core.signals.
+    When a UserProfile `queryset` is given, only its profiles are ranked, so the other
+    filters of a search are applied before the result is cut to `limit`.
+    """
+
+    def index(self, profile):
+        raise NotImplementedError
+
+    def remove(self, profile_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query, columns=SEARCH_COLUMNS, limit=None, queryset=None):
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    SQLite FTS5 table keyed by profile id (rowid). Every term of the query is matched as a
+    prefix and results are ranked with bm25(). The table is created by the accounts migrations.
+    """
+
+    def index(self, profile):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [profile.pk])
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)',
+                [profile.pk, *(getattr(profile, column) or '' for column in SEARCH_COLUMNS)]
+            )
+
+    def remove(self, profile_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [profile_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_COLUMNS)}) '
+                f'SELECT id, {", ".join(f"COALESCE({column}, %s)" for column in SEARCH_COLUMNS)} '
+                f'FROM {UserProfile._meta.db_table}',
+                [''] * len(SEARCH_COLUMNS)
+            )
+
+    def build_match(self, query, columns):
+        # Quote every term so user input can't inject FTS syntax, then match it as a prefix
+        terms = ['"{}"*'.format(term.replace('"', '""')) for term in query.split()]
+        if not terms:
+            return None
+        return '{%s}: (%s)' % (' '.join(columns), ' OR '.join(terms))
+
+    def search(self, query, columns=SEARCH_COLUMNS, limit=None, queryset=None):
+        match = self.build_match(query, columns)
+        if match is None:
+            return []
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        restrict, params = '', []
+        if queryset is not None:
+            sql, params = queryset.order_by().values('id').query.sql_with_params()
+            restrict = f'AND rowid IN ({sql}) '
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s {restrict}'
+                f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s',
+                [match, *params, limit or settings.PROFILE_SEARCH_MAX_RESULTS]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Index-free fallback for databases without FTS5: unranked icontains matching.
+    """
+
+    def index(self, profile):
+        pass
+
+    def remove(self, profile_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, columns=SEARCH_COLUMNS, limit=None, queryset=None):
+        condition = Q()
+        for term in query.split():
+            for column in columns:
+                condition |= Q(**{f'{column}__icontains': term})
+        if not condition:
+            return []
+        profiles = UserProfile.objects.all() if queryset is None else queryset
+        ids = profiles.filter(condition).order_by('id').values_list('id', flat=True)
+        return list(ids[:limit or settings.PROFILE_SEARCH_MAX_RESULTS])
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.PROFILE_SEARCH_BACKEND)()
+    return _backend
+
+
+def ranked(queryset, ids, field='id'):
+    """
+    Restricts `queryset` to the given search result ids, keeping their relevance order.
+    """
+    if not ids:
+        return queryset.none()
+    order = Case(*[When(**{field: pk}, then=position) for position, pk in enumerate(ids)])
+    return queryset.filter(**{f'{field}__in': ids}).order_by(order)
+
+
+def profile_ids_queryset(lookups):
+    # Unordered on purpose: an ORDER BY id would let the database walk the primary key
+    # instead of the filter's index
+    return UserProfile.objects.filter(**lookups).values_list('id', flat=True)
+
+
+def _match_ids(lookups, full_name):
+    if full_name:
+        # Only the profiles passing the other filters are ranked, so no match is lost to
+        # the result limit
+        matched = fighter_index.match_ids(lookups)
+        if matched is None:
+            profiles = profile_ids_queryset(lookups)
+        else:
+            profiles = UserProfile.objects.filter(id__in=matched)
+        return get_search_backend().search(full_name, columns=('full_name', 'username'), queryset=profiles)
+
+    limit = settings.SEARCH_CACHE_MAX_IDS
+    ids = fighter_index.match_ids(lookups)
+    if ids is None:
+        ids = sorted(profile_ids_queryset(lookups)[:limit + 1])
+    return ids if len(ids) <= limit else None
+
+
+def search_profile_ids(lookups, full_name=''):
+    """
+    Ids of the profiles matching the UserProfile `lookups` and, when given, `full_name`:
+    by relevance for a name search, by id otherwise. Results are cached per canonical
+    parameter set until a profile changes. Returns None when more than
+    SEARCH_CACHE_MAX_IDS profiles match, leaving the query to the caller.
+    """
+    # The lookups are already canonical: normalized text, parsed numbers and dates
+    full_name = ' '.join((full_name or '').lower().split())
+    params = repr((sorted((lookup, str(value)) for lookup, value in lookups.items()), full_name))
+    key = hashlib.sha1(params.encode()).hexdigest()
+    return get_or_build(SEARCH_RESULTS, key, lambda: _match_ids(lookups, full_name),
+                        timeout=settings.SEARCH_CACHE_TIMEOUT)
+
+
+def facet_counts(queryset, facets=tuple(FACETS)):
+    """
+    Counts the profiles of `queryset` per value of each of `facets` with a single grouped
+    query over the combinations of their columns, so the cost is one aggregate over the
+    filtered rows no matter how many facets are asked for.
+    Returns {facet: [{'value', 'label', 'count'}, ...]}, most frequent first.
+    """
+    queryset = queryset.order_by()
+    if 'weight' in facets:
+        queryset = queryset.annotate(weight_bucket=weight_bucket_expression())
+    labels = {f'{facet}_label': Min(FACETS[facet][1]) for facet in facets if FACETS[facet][1]}
+    rows = queryset.values(*[FACETS[facet][0] for facet in facets]).annotate(count=Count('id'), **labels)
+
+    counts = {facet: {} for facet in facets}
+    for row in rows:
+        for facet in facets:
+            value = row[FACETS[facet][0]]
+            if not value:
+                continue
+            label = row.get(f'{facet}_label', value)
+            entry = counts[facet].setdefault(value, {'value': value, 'label': label, 'count': 0})
+            entry['label'] = min(entry['label'], label)
+            entry['count'] += row['count']
+    return {facet: sorted(values.values(), key=lambda entry: -entry['count']) for facet, values in counts.items()}
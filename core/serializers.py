@@ -0,0 +1,111 @@
+from django.db import models
+from rest_framework import serializers
+
+from accounts.models import Favourite
+from profiles.models import Like
+
+
+class ViewerState:
+    """
+    What the requesting user has liked and favourited, resolved in batches.
+
+    List serializers load a whole page of ids with one query per relation, after which
+    is_liked()/is_favourite() are answered from memory. Objects that were not preloaded
+    fall back to a query for just that object.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.liked_post_ids = set()
+        self.loaded_post_ids = set()
+        self.favourite_profile_ids = set()
+        self.loaded_profile_ids = set()
+
+    def load_posts(self, post_ids):
+        post_ids = set(post_ids) - self.loaded_post_ids
+        if post_ids:
+            self.liked_post_ids.update(Like.objects.filter(
+                user=self.user, post_id__in=post_ids
+            ).values_list('post_id', flat=True))
+            self.loaded_post_ids.update(post_ids)
+
+    def load_profiles(self, profile_ids):
+        profile_ids = set(profile_ids) - self.loaded_profile_ids
+        if profile_ids:
+            self.favourite_profile_ids.update(Favourite.objects.filter(
+                user=self.user, favourite_profile_id__in=profile_ids
+            ).values_list('favourite_profile_id', flat=True))
+            self.loaded_profile_ids.update(profile_ids)
+
+    def is_liked(self, post_id):
+        self.load_posts([post_id])
+        return post_id in self.liked_post_ids
+
+    def is_favourite(self, profile_id):
+        self.load_profiles([profile_id])
+        return profile_id in self.favourite_profile_ids
+
+
+def get_viewer_state(context):
+    """
+    Returns the ViewerState shared by every serializer rendering the current request,
+    or None for anonymous requests and serializers used without a request.
+    """
+    request = context.get('request')
+    if request is None or not request.user.is_authenticated:
+        return None
+    if 'viewer_state' not in context:
+        context['viewer_state'] = ViewerState(request.user)
+    return context['viewer_state']
+
+
+class ViewerStateListSerializer(serializers.ListSerializer):
+    """
+    Lets the child serializer preload viewer state for the whole page through its
+    load_viewer_state(instances, state) hook before the items are rendered one by one.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        iterable = list(iterable)
+        state = get_viewer_state(self.context)
+        if state is not None and iterable:
+            self.child.load_viewer_state(iterable, state)
+        return super().to_representation(iterable)
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for top level serializers. `?fields=a,b` limits the output to those
+    fields and `?expand=x,y` opts in to the heavy blocks listed in Meta.expandable_fields,
+    which are dropped as soon as a client starts selecting fields. Without either
+    parameter every field is rendered, as before.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get('context', {}).get('request')
+        if request is None:
+            return
+
+        selected = self.select_fields(getattr(request, 'query_params', request.GET))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    def select_fields(self, params):
+        available = set(self.fields)
+        fields, expand = params.get('fields'), params.get('expand')
+        if not fields and not expand:
+            return available
+
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        selected = {name.strip() for name in fields.split(',')} if fields else available - expandable
+        if expand:
+            selected |= {name.strip() for name in expand.split(',')} & expandable
+        return selected & available
+
+    @classmethod
+    def get_selected_fields(cls, request):
+        # Lets views shape their prefetches after the fields that will actually be rendered
+        return set(cls(context={'request': request}).fields)
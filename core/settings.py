@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'news',
     'adminfunc',
+    'core',
 ]
 
 MIDDLEWARE = [
@@ -77,6 +78,61 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='boxclub'),
+    }
+}
+
+# Seconds a shared section of the home payload is kept before being rebuilt
+HOME_CACHE_TIMEOUT = config('HOME_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds the per weight bucket id lists used for random fighter sampling are trusted
+# before being rebuilt from the database
+FIGHTER_SAMPLE_INDEX_TIMEOUT = config('FIGHTER_SAMPLE_INDEX_TIMEOUT', default=3600, cast=int)
+
+# Number of most recent comments embedded in each serialized post
+POST_COMMENTS_PREVIEW_SIZE = config('POST_COMMENTS_PREVIEW_SIZE', default=3, cast=int)
+
+# Fighter name search index, see core/search.py. FTS5 needs SQLite; other databases fall
+# back to unranked icontains matching
+PROFILE_SEARCH_BACKEND = config(
+    'PROFILE_SEARCH_BACKEND',
+    default='core.search.SQLiteFTS5Backend' if 'sqlite' in DATABASES['default']['ENGINE']
+    else 'core.search.DatabaseSearchBackend'
+)
+PROFILE_SEARCH_MAX_RESULTS = config('PROFILE_SEARCH_MAX_RESULTS', default=500, cast=int)
+
+# Answer the profile search filters from a per-process in-memory index (core/fighter_index.py)
+# instead of the database. Matches beyond FIGHTER_INDEX_MAX_RESULTS are left to the database,
+# which has to load those rows anyway
+FIGHTER_INDEX_ENABLED = config('FIGHTER_INDEX_ENABLED', default=False, cast=bool)
+FIGHTER_INDEX_MAX_RESULTS = config('FIGHTER_INDEX_MAX_RESULTS', default=5000, cast=int)
+# Seconds a logged profile change is kept for other processes to apply to their index; a
+# process that misses one rebuilds its index
+FIGHTER_INDEX_CHANGELOG_TIMEOUT = config('FIGHTER_INDEX_CHANGELOG_TIMEOUT', default=3600, cast=int)
+
+# Seconds the ordered id list of a search is cached; any profile change invalidates all of them.
+# Searches matching more than SEARCH_CACHE_MAX_IDS profiles are not cached
+SEARCH_CACHE_TIMEOUT = config('SEARCH_CACHE_TIMEOUT', default=300, cast=int)
+SEARCH_CACHE_MAX_IDS = config('SEARCH_CACHE_MAX_IDS', default=5000, cast=int)
+
+# Rows read and serialized at a time by the ?export=jsonl streaming responses
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=1000, cast=int)
+
+# Opponent suggestions (core/matchmaking.py) look at the fighter's weight class and the two
+# next to it; classes are MATCHMAKING_WEIGHT_CLASS_KG wide and cached for MATCHMAKING_INDEX_TIMEOUT seconds
+MATCHMAKING_WEIGHT_CLASS_KG = config('MATCHMAKING_WEIGHT_CLASS_KG', default=5, cast=int)
+MATCHMAKING_INDEX_TIMEOUT = config('MATCHMAKING_INDEX_TIMEOUT', default=3600, cast=int)
+MATCHMAKING_MAX_SUGGESTIONS = config('MATCHMAKING_MAX_SUGGESTIONS', default=50, cast=int)
+
+# Width in kg of the leaderboard weight classes; run rebuild_leaderboards after changing it
+LEADERBOARD_WEIGHT_CLASS_KG = config('LEADERBOARD_WEIGHT_CLASS_KG', default=5, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,96 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import CustomUser, UserProfile
+from adminfunc.models import ProbableFight
+from news.models import News
+from profiles.models import Post, Like, Comment, FightStats
+from core import fighter_index, matchmaking, sampling
+from core.search import get_search_backend
+from core.cache import bump_generation, get_home_post_ids, HOME_POSTS, HOME_NEWS, HOME_FIGHTERS, \
+    HOME_PROBABLE_FIGHTS, SEARCH_RESULTS
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_home_posts(sender, **kwargs):
+    bump_generation(HOME_POSTS)
+
+
+@receiver([post_save, post_delete], sender=Like)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_home_post_counters(sender, instance, **kwargs):
+    # Likes and comments are embedded in the cached post page as counts and previews, so
+    # only those on one of its posts make it stale
+    post_ids = get_home_post_ids()
+    if post_ids is None or instance.post_id in post_ids:
+        bump_generation(HOME_POSTS)
+
+
+@receiver([post_save, post_delete], sender=News)
+def invalidate_home_news(sender, **kwargs):
+    bump_generation(HOME_NEWS)
+
+
+@receiver([post_save, post_delete], sender=ProbableFight)
+def invalidate_home_probable_fights(sender, **kwargs):
+    bump_generation(HOME_PROBABLE_FIGHTS)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_home_profiles(sender, **kwargs):
+    # Profiles show up as fighter cards, post authors and probable fight participants
+    bump_generation(HOME_FIGHTERS, HOME_POSTS, HOME_PROBABLE_FIGHTS)
+
+
+# The CustomUser fields a cached search depends on; the rest (last_login, password, ...) are
+# written on every login and must not clear the cache
+SEARCH_USER_FIELDS = {'is_verified', 'username'}
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_search_results(sender, update_fields=None, **kwargs):
+    # Cached searches hold id lists, so any profile or verification change can alter them
+    if sender is CustomUser and update_fields is not None and not SEARCH_USER_FIELDS & set(update_fields):
+        return
+    bump_generation(SEARCH_RESULTS)
+
+
+@receiver(post_save, sender=UserProfile)
+def update_fighter_sample_index(sender, instance, **kwargs):
+    sampling.update_profile(instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_from_fighter_sample_index(sender, instance, **kwargs):
+    sampling.update_profile(instance, deleted=True)
+
+
+@receiver(post_save, sender=UserProfile)
+def update_search_index(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def update_fighter_index(sender, instance, **kwargs):
+    fighter_index.refresh_profile(instance.pk)
+
+
+@receiver(post_save, sender=FightStats)
+def update_fighter_index_record(sender, instance, **kwargs):
+    fighter_index.refresh_profile(instance.user_profile_id)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def update_matchmaking_index(sender, instance, **kwargs):
+    matchmaking.update_profile(instance.pk)
+
+
+@receiver(post_save, sender=FightStats)
+def update_matchmaking_index_record(sender, instance, **kwargs):
+    matchmaking.update_profile(instance.user_profile_id)
@@ -0,0 +1,264 @@
+import datetime
+import json
+from base64 import urlsafe_b64encode
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import CustomUser, UserProfile
+from profiles.models import FightStats, Post
+from . import fighter_index, matchmaking
+from .fighter_index import FighterIndex, get_fighter_index
+from .search import search_profile_ids
+from .pagination import KeysetPagination
+
+
+def create_fighter(number, **fields):
+    user = CustomUser.objects.create_user(username=f'fighter{number}', password=None,
+                                          phone_number=f'+7000000{number:04d}')
+    profile = user.profile
+    for field, value in fields.items():
+        setattr(profile, field, value)
+    profile.save()
+    return profile
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(username='author', password='x', phone_number='+70000000001')
+        posts = [Post.objects.create(user=user, title=f'post {number}') for number in range(8)]
+        # The last five posts share a timestamp, so pages have to break ties on the id
+        start = timezone.now()
+        for number, post in enumerate(posts):
+            Post.objects.filter(pk=post.pk).update(created_at=start + datetime.timedelta(minutes=min(number, 3)))
+        cls.expected = list(Post.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def paginate(self, url):
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(Post.objects.all(), Request(APIRequestFactory().get(url)))
+        return [post.pk for post in page], paginator.get_next_link(), paginator.get_previous_link()
+
+    def test_cursor_round_trip(self):
+        pages, url = [], '/posts/?page_size=3'
+        while url:
+            ids, url, previous = self.paginate(url)
+            self.assertEqual(previous is None, not pages)
+            pages.append(ids)
+        self.assertEqual(pages, [self.expected[:3], self.expected[3:6], self.expected[6:]])
+
+        # Walking back from the last page returns the same pages in reverse
+        _, url, _ = self.paginate(self.paginate('/posts/?page_size=3')[1])
+        back = []
+        while url:
+            ids, _, url = self.paginate(url)
+            back.append(ids)
+        self.assertEqual(back, [self.expected[6:], self.expected[3:6], self.expected[:3]])
+
+    def test_invalid_cursor(self):
+        def encode(position):
+            return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+        for cursor in ('garbage', encode([1, 2]), encode({'c': '2024-01-01T00:00:00', 'i': 1}),
+                       encode({'c': 'yesterday', 'i': 1, 'r': 0}), encode({'c': '2024-01-01T00:00:00', 'i': 'x', 'r': 0})):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(f'/posts/?cursor={cursor}')
+
+
+@override_settings(FIGHTER_INDEX_ENABLED=True)
+class FighterIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        fighter_index._index = fighter_index._sequence = None
+        self.profiles = [
+            create_fighter(number, weight=60 + number * 5, height=str(165 + number) if number % 4 else '',
+                           birth_date=datetime.date(1990 + number, 1 + number % 12, 1),
+                           sport=['Boxing', 'MMA', 'Judo'][number % 3], city=['Almaty', 'Astana'][number % 2],
+                           status=['Free', 'Injury'][number % 2], is_verified=number % 3 != 0)
+            for number in range(12)
+        ]
+        for number, profile in enumerate(self.profiles[:6]):
+            FightStats.objects.update_or_create(user_profile=profile, defaults={'wins': number, 'losses': 1})
+
+    def count_builds(self):
+        return mock.patch.object(FighterIndex, 'build', wraps=FighterIndex.build)
+
+    def test_filter_matches_orm(self):
+        index = FighterIndex.build()
+        lookups = [
+            {},
+            {'weight__gte': 70, 'weight__lte': 100},
+            {'weight__gt': 70, 'weight__lt': 100, 'sport_norm': 'boxing'},
+            {'weight': 85},
+            {'city_norm__in': ['almaty', 'nowhere'], 'is_verified': True},
+            {'status_norm': 'free', 'rank': False},
+            {'height_cm__isnull': True},
+            {'height_cm__gte': 170},
+            {'birth_date__lte': datetime.date(1995, 6, 1)},
+            {'stats__wins__gte': 2},
+            {'stats__losses': 1, 'sport_norm__in': ['mma', 'judo']},
+        ]
+        for lookup in lookups:
+            with self.subTest(lookup=lookup):
+                expected = list(UserProfile.objects.filter(**lookup).order_by('id').values_list('id', flat=True))
+                self.assertEqual(index.filter(**lookup), expected)
+
+    def test_replays_logged_changes(self):
+        get_fighter_index()
+        moved, removed = self.profiles[1], self.profiles[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.weight = 200
+            moved.save()
+            removed.delete()
+            added = create_fighter(99, weight=201)
+
+        with self.count_builds() as build:
+            index = get_fighter_index()
+        build.assert_not_called()
+        self.assertEqual(index.filter(weight__gte=200), [moved.pk, added.pk])
+        self.assertNotIn(removed.pk, index.filter())
+        self.assertEqual(index.filter(), list(UserProfile.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_evicted_sequence_rebuilds(self):
+        get_fighter_index()
+        cache.delete(fighter_index._SEQUENCE_KEY)
+        with self.count_builds() as build, mock.patch.object(fighter_index, '_change_key') as change_key:
+            get_fighter_index()
+        build.assert_called_once()
+        change_key.assert_not_called()
+
+    def test_expired_change_rebuilds(self):
+        get_fighter_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profiles[0].save()
+            self.profiles[1].save()
+        cache.delete(fighter_index._change_key(cache.get(fighter_index._SEQUENCE_KEY)))
+        with self.count_builds() as build:
+            get_fighter_index()
+        build.assert_called_once()
+
+
+class MatchmakingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profiles = [
+            create_fighter(number, weight=70 + number, height='175', birth_date=datetime.date(1995, 1, 1),
+                           sport='Boxing', status='Free', is_verified=True)
+            for number in range(6)
+        ]
+        self.heavy = create_fighter(10, weight=100, sport='Boxing', status='Ready to fight', is_verified=True)
+        self.injured = create_fighter(11, weight=71, sport='Boxing', status='Injury', is_verified=True)
+        self.judoka = create_fighter(12, weight=72, sport='Judo', status='Free', is_verified=True)
+
+    def classes(self):
+        numbers = cache.get(matchmaking._CLASSES_KEY)
+        return {number: cache.get(matchmaking._class_key(number)) for number in numbers}
+
+    def assertMatchesRebuild(self):
+        incremental = self.classes()
+        cache.clear()
+        matchmaking.build_index()
+        self.assertEqual(self.classes(), incremental)
+
+    def suggested(self, profile, k=10):
+        return [profile_id for _, profile_id in matchmaking.suggest_opponents(profile, k)]
+
+    def test_suggestions(self):
+        first = self.profiles[0]
+        suggested = self.suggested(first)
+        # Nearest weight first; not the fighter, other sports, unavailable or distant fighters
+        self.assertEqual(suggested, [profile.pk for profile in self.profiles[1:]])
+        self.assertEqual(self.suggested(first, k=2), suggested[:2])
+
+    def test_moves_on_weight_change(self):
+        matchmaking.build_index()
+        moved = self.profiles[2]
+        moved.weight = 99
+        moved.save()
+
+        self.assertNotIn(moved.pk, self.suggested(self.profiles[0]))
+        self.assertIn(moved.pk, self.suggested(self.heavy))
+        self.assertMatchesRebuild()
+
+    def test_moves_on_status_change(self):
+        matchmaking.build_index()
+        self.injured.status = 'Ready to fight'
+        self.injured.save()
+        unavailable = self.profiles[1]
+        unavailable.status = 'Injury'
+        unavailable.save()
+
+        suggested = self.suggested(self.profiles[0])
+        self.assertIn(self.injured.pk, suggested)
+        self.assertNotIn(unavailable.pk, suggested)
+        self.assertMatchesRebuild()
+
+    def test_deleted_profile_leaves_index(self):
+        matchmaking.build_index()
+        self.profiles[3].user.delete()
+        self.assertNotIn(self.profiles[3].pk, self.suggested(self.profiles[0]))
+        self.assertMatchesRebuild()
+
+    def test_busy_lock_invalidates(self):
+        matchmaking.build_index()
+        cache.add('lock:matchmaking', True)
+        matchmaking.update_profile(self.profiles[0].pk)
+        self.assertIsNone(cache.get(matchmaking._CLASSES_KEY))
+
+
+class SearchProfileIdsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profiles = [
+            create_fighter(number, full_name=f'Fighter {name}', weight=60 + number * 10,
+                           sport=['Boxing', 'MMA'][number % 2], birth_date=datetime.date(1995, 1, 1))
+            for number, name in enumerate(['Asan Bek', 'Berik Asan', 'Asan Nur', 'Dias Kair'])
+        ]
+        self.lookups = {'sport_norm': 'boxing', 'birth_date__isnull': False}
+
+    def test_cached_until_a_profile_changes(self):
+        boxers = [self.profiles[0].pk, self.profiles[2].pk]
+        self.assertEqual(search_profile_ids(self.lookups), boxers)
+        with self.assertNumQueries(0):
+            self.assertEqual(search_profile_ids(self.lookups), boxers)
+
+        switched = self.profiles[1]
+        switched.sport = 'Boxing'
+        switched.save()
+        self.assertEqual(search_profile_ids(self.lookups), sorted(boxers + [switched.pk]))
+
+        self.profiles[0].user.delete()
+        self.assertEqual(search_profile_ids(self.lookups), sorted([self.profiles[2].pk, switched.pk]))
+
+    def test_user_changes(self):
+        search_profile_ids(self.lookups)
+        user = self.profiles[0].user
+        # Written on every login, irrelevant to searches
+        user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            search_profile_ids(self.lookups)
+
+        user.is_verified = True
+        user.save(update_fields=['is_verified'])
+        with self.assertNumQueries(1):
+            search_profile_ids(self.lookups)
+
+    def test_name_search_within_filters(self):
+        self.assertEqual(set(search_profile_ids(self.lookups, '  ASAN ')), {self.profiles[0].pk, self.profiles[2].pk})
+
+        # Only the filtered profiles are ranked, so a better name match among other sports can't
+        # take up the result limit
+        cache.clear()
+        with self.settings(PROFILE_SEARCH_MAX_RESULTS=1):
+            self.assertEqual(search_profile_ids({'sport_norm': 'mma'}, 'asan'), [self.profiles[1].pk])
+            self.assertIn(search_profile_ids(self.lookups, 'asan')[0], [self.profiles[0].pk, self.profiles[2].pk])
+
+    @override_settings(SEARCH_CACHE_MAX_IDS=2)
+    def test_too_many_matches(self):
+        self.assertIsNone(search_profile_ids({'birth_date__isnull': False}))
+        self.assertEqual(len(search_profile_ids(self.lookups)), 2)
@@ -5,7 +5,7 @@ from drf_yasg import openapi
 from rest_framework import permissions
 from django.conf import settings
 from django.conf.urls.static import static
-from core.views import HomeAPIView, UserProfileSearchAPIView
+from core.views import HomeAPIView, OpponentSuggestionAPIView, UserProfileSearchAPIView
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -28,6 +28,8 @@ urlpatterns = [
     path('api/', include('news.urls')),
     path('api/v1/admin/', include('adminfunc.urls')),
     path('api/v1/search/', UserProfileSearchAPIView.as_view(), name='userprofile-search'),
+    path('api/v1/matchmaking/suggest/<str:username>/', OpponentSuggestionAPIView.as_view(),
+         name='matchmaking-suggest'),
     path('api/home/', HomeAPIView.as_view(), name='home-api'),
 
 # Swagger and ReDoc URLs
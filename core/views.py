@@ -2,14 +2,16 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from accounts.models import CustomUser
 from adminfunc.models import ProbableFight
 from adminfunc.serializers import ProbableFightSerializer
 from news.serializers import NewsSerializer
 from news.models import News
 from profiles.models import Post
-from profiles.serializers import VerifiedUserProfileSerializer, PostSerializer
-import random
+from core import sampling
+from core.pagination import KeysetPagination
+from core.serializers import get_viewer_state
+from core.cache import get_or_build, set_home_post_ids, HOME_POSTS, HOME_NEWS, HOME_FIGHTERS, HOME_PROBABLE_FIGHTS
+from profiles.serializers import VerifiedUserProfileSerializer, PostSerializer, latest_comments_prefetch
 import logging
 from rest_framework.pagination import PageNumberPagination
 
@@ -25,8 +27,52 @@ class HomeAPIView(APIView):
     pagination_class = PostPagination
 
     def get(self, request):
-        # Initialize paginator
-        paginator = self.pagination_class()
+        # Everything except is_liked is shared between viewers, so it is served from the
+        # cache and rebuilt only when core.signals bumps the matching section
+        origin = request.build_absolute_uri('/')
+
+        latest_posts = self.get_latest_posts(request, origin)
+        latest_posts['results'] = self.apply_viewer_state(request, latest_posts['results'])
+
+        news_data = get_or_build(HOME_NEWS, 'all', self.get_latest_news)
+
+        fighters = get_or_build(HOME_FIGHTERS, origin, lambda: {
+            bucket: self.get_users_by_weight(request, bucket) for bucket in sampling.WEIGHT_BUCKETS
+        })
+
+        probable_fights = get_or_build(HOME_PROBABLE_FIGHTS, origin,
+                                       lambda: self.get_probable_fights(request))
+
+        return Response({
+            'latest_posts': latest_posts,
+            'latest_news': news_data,
+            'users_0_65': fighters['users_0_65'],
+            'users_66_93': fighters['users_66_93'],
+            'users_94_120': fighters['users_94_120'],
+            'probable_fights': probable_fights,
+            'links': {
+                'full_users_0_65': request.build_absolute_uri('/accounts/search/?weight_min=0&weight_max=145'),
+                'full_users_66_93': request.build_absolute_uri('/accounts/search/?weight_min=146&weight_max=170'),
+                'full_users_94_120': request.build_absolute_uri('/accounts/search/?weight_min=171')
+            }
+        })
+
+    def get_latest_posts(self, request, origin):
+        # Only the default first page is shared; deeper pages are built per request
+        if set(request.query_params) - {'page'} or request.query_params.get('page', '1') != '1':
+            return self.paginate_latest_posts(request)
+        return dict(get_or_build(HOME_POSTS, origin, lambda: self.build_first_page(request)))
+
+    def build_first_page(self, request):
+        page = self.paginate_latest_posts(request)
+        set_home_post_ids(post['id'] for post in page['results'])
+        return page
+
+    def paginate_latest_posts(self, request):
+        # Clients opt in to keyset pagination with ?pagination=cursor, the page number
+        # format stays the default for older app versions
+        cursor_mode = request.query_params.get('pagination') == 'cursor'
+        paginator = KeysetPagination() if cursor_mode else self.pagination_class()
 
         # Get latest posts from verified users
         latest_posts = Post.objects.filter(
@@ -35,59 +81,20 @@ class HomeAPIView(APIView):
             'user',
             'user__profile'
         ).prefetch_related(
-            'comments',
-            'comments__user',
-            'comments__user__profile',
-            'likes'
+            latest_comments_prefetch()
         ).order_by('-created_at')
 
         # Paginate posts
         paginated_posts = paginator.paginate_queryset(latest_posts, request)
         posts_serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
 
-        # Get all news, ordered by latest first
-        all_news = News.objects.all().order_by('-id')
-        news_serializer = NewsSerializer(all_news, many=True)
-
-        # Helper function to get random verified users by weight range
-        def get_users_by_weight(min_weight, max_weight=None):
-            if max_weight:
-                eligible_users = CustomUser.objects.filter(
-                    is_verified=True,
-                    profile__weight__gte=min_weight,
-                    profile__weight__lte=max_weight
-                ).prefetch_related('profile').distinct()
-            else:
-                eligible_users = CustomUser.objects.filter(
-                    is_verified=True,
-                    profile__weight__gte=min_weight
-                ).prefetch_related('profile').distinct()
-
-            if eligible_users.exists():
-                random_users = random.sample(list(eligible_users), min(len(eligible_users), 4))
-                serialized_data = VerifiedUserProfileSerializer(
-                    random_users,
-                    many=True,
-                    context={'request': request}  # Add request to context
-                ).data
-                return serialized_data
-            else:
-                logger.info(f"No users found for weight range {min_weight} - {max_weight}")
-                return []
-
-        # Collect data for weight ranges
-        users_0_65 = get_users_by_weight(0, 145)
-        users_66_93 = get_users_by_weight(146, 170)
-        users_94_120 = get_users_by_weight(171)
-
-        probable_fights = ProbableFight.objects.all().order_by('-created_at')[:5]
-        probable_fights_serializer = ProbableFightSerializer(
-            probable_fights,
-            many=True,
-            context={'request': request}  # Add request to context
-        )
-
         # Get pagination information
+        if cursor_mode:
+            return {
+                'results': posts_serializer.data,
+                'pagination': paginator.get_pagination_data()
+            }
+
         pagination_data = {
             'count': paginator.page.paginator.count,
             'next': paginator.get_next_link(),
@@ -96,39 +103,127 @@ class HomeAPIView(APIView):
             'total_pages': paginator.page.paginator.num_pages,
         }
 
-        return Response({
-            'latest_posts': {
-                'results': posts_serializer.data,
-                'pagination': pagination_data
-            },
-            'latest_news': news_serializer.data,
-            'users_0_65': users_0_65,
-            'users_66_93': users_66_93,
-            'users_94_120': users_94_120,
-            'probable_fights': probable_fights_serializer.data,
-            'links': {
-                'full_users_0_65': request.build_absolute_uri('/accounts/search/?weight_min=0&weight_max=145'),
-                'full_users_66_93': request.build_absolute_uri('/accounts/search/?weight_min=146&weight_max=170'),
-                'full_users_94_120': request.build_absolute_uri('/accounts/search/?weight_min=171')
-            }
-        })
+        return {
+            'results': posts_serializer.data,
+            'pagination': pagination_data
+        }
+
+    def apply_viewer_state(self, request, posts):
+        state = get_viewer_state({'request': request})
+        if state is None:
+            return [{**post, 'is_liked': False} for post in posts]
+        state.load_posts(post['id'] for post in posts)
+        return [{**post, 'is_liked': state.is_liked(post['id'])} for post in posts]
+
+    def get_latest_news(self):
+        # Get all news, ordered by latest first
+        all_news = News.objects.all().order_by('-id')
+        return NewsSerializer(all_news, many=True).data
+
+    def get_users_by_weight(self, request, bucket):
+        # Get random verified users for one of the sampling.WEIGHT_BUCKETS
+        random_users = sampling.sample_fighters(bucket, 4)
+        if not random_users:
+            logger.info(f"No users found for weight bucket {bucket}")
+            return []
+
+        return VerifiedUserProfileSerializer(
+            random_users,
+            many=True,
+            context={'request': request}  # Add request to context
+        ).data
+
+    def get_probable_fights(self, request):
+        probable_fights = ProbableFight.objects.select_related(
+            'fighter1__profile', 'fighter2__profile'
+        ).order_by('-created_at', '-id')[:5]
+        return ProbableFightSerializer(
+            probable_fights,
+            many=True,
+            context={'request': request}  # Add request to context
+        ).data
 
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from accounts.models import UserProfile
 from accounts.serializers import UserProfileSerializer
-from django.db.models import Q, F, ExpressionWrapper, IntegerField
-from django.db.models.functions import ExtractYear, Now
-from django.utils import timezone
+from core.pagination import SearchPagination, json_lines_response
+from core.search import FACETS, facet_counts, ranked, search_profile_ids
+from accounts.utils import birth_date_range, normalize_text, parse_height_param
 
 
 class UserProfileSearchAPIView(APIView):
+    pagination_class = SearchPagination
+
     def get(self, request, *args, **kwargs):
+        # ?export=jsonl streams every match as JSON Lines instead of returning a page
+        if request.GET.get('export') == 'jsonl':
+            return json_lines_response(self.get_queryset(), UserProfileSerializer, context={'request': request})
+
+        facets = self.get_facets()
+        paginator = self.pagination_class()
+        profiles, lookups, ids = self.search()
+        if ids is None:
+            # Too many matches to cache as an id list
+            page = paginator.paginate_queryset(self.matches(profiles, lookups, ids), request, view=self)
+        else:
+            # Only the profiles of the requested page are loaded
+            page_ids = paginator.paginate_queryset(ids, request, view=self)
+            loaded = profiles.in_bulk(page_ids)
+            page = [loaded[pk] for pk in page_ids if pk in loaded]
+
+        # Serialize the profiles
+        serializer = UserProfileSerializer(page, many=True, context={'request': request})
+        response = paginator.get_paginated_response(serializer.data)
+        if facets:
+            # Counted over the matches found above rather than searching again
+            response.data['facets'] = facet_counts(self.matches(profiles, lookups, ids), facets)
+        return response
+
+    def get_facets(self):
+        # ?facets=true counts every facet, ?facets=sport,city only the listed ones
+        requested = self.request.GET.get('facets', '').lower()
+        if requested in ('', 'false', '0'):
+            return ()
+        if requested in ('true', '1', 'all'):
+            return tuple(FACETS)
+        facets = tuple(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+        unknown = [name for name in facets if name not in FACETS]
+        if unknown:
+            raise ValidationError({'facets': f"Unknown facets {', '.join(unknown)}, expected some of "
+                                             f"{', '.join(FACETS)}."})
+        return facets
+
+    def search(self):
+        """
+        Returns the base profile queryset, the filter lookups and the ordered ids of the
+        matching profiles, None when there are too many of them to cache.
+        """
+        # Start with all profiles, joining fight stats only when they are rendered
+        profiles = UserProfile.objects.all()
+        if 'fight_stats' in UserProfileSerializer.get_selected_fields(self.request):
+            profiles = profiles.select_related('stats')
+
+        lookups = self.get_lookups()
+        return profiles, lookups, search_profile_ids(lookups, self.request.GET.get('full_name', ''))
+
+    def get_queryset(self):
+        return self.matches(*self.search())
+
+    def matches(self, profiles, lookups, ids):
+        # The search() results as a queryset in result order
+        if ids is None:
+            return profiles.filter(**lookups).order_by('id')
+        if self.request.GET.get('full_name'):
+            return ranked(profiles, ids)
+        return profiles.filter(id__in=ids).order_by('id')
+
+    def get_lookups(self):
+        request = self.request
         # Get search parameters from request.GET and convert to lowercase
         city = request.GET.get('city', '').lower()
-        full_name = request.GET.get('full_name', '').lower()
         sport = request.GET.get('sport', '').lower()
         weight_min = request.GET.get('weight_min')
         weight_max = request.GET.get('weight_max')
@@ -136,74 +231,98 @@ class UserProfileSearchAPIView(APIView):
         height_max = request.GET.get('height_max')
         age_min = request.GET.get('age_min')
         age_max = request.GET.get('age_max')
-        status = request.GET.get('status', '').lower()  # Convert status to lowercase
-
-        # Start with all profiles
-        profiles = UserProfile.objects.all()
+        profile_status = request.GET.get('status', '').lower()  # Convert status to lowercase
 
-        # Apply case-insensitive filters
+        # Filters as UserProfile lookups, so the ORM and the fighter index can both run them.
+        # City, sport and status are case, accent and spacing insensitive, matched exactly on
+        # the indexed normalized columns
+        lookups = {}
         if city:
-            profiles = profiles.filter(city__iexact=city)  # Changed to iexact
-        if full_name:
-            # Split name for more flexible search
-            name_parts = full_name.split()
-            name_query = Q()
-            for part in name_parts:
-                name_query |= Q(full_name__icontains=part)  # Already case-insensitive
-            profiles = profiles.filter(name_query)
+            lookups['city_norm'] = normalize_text(city)
         if sport:
-            profiles = profiles.filter(sport__iexact=sport)  # Changed to iexact
-
-        # Case-insensitive status filter
-        if status:
-            profiles = profiles.filter(status__iexact=status)  # Changed to iexact
+            lookups['sport_norm'] = normalize_text(sport)
+        if profile_status:
+            lookups['status_norm'] = normalize_text(profile_status)
 
         if weight_min:
             try:
-                profiles = profiles.filter(weight__gte=int(weight_min))
+                lookups['weight__gte'] = int(weight_min)
             except ValueError:
                 pass
         if weight_max:
             try:
-                profiles = profiles.filter(weight__lte=int(weight_max))
+                lookups['weight__lte'] = int(weight_max)
             except ValueError:
                 pass
 
-        # For height, since it's a CharField, ensure heights are numeric and compare as integers
+        # Heights are compared on the normalized height_cm column; an unusable bound is an error
+        # instead of a silently dropped filter
         if height_min:
-            try:
-                height_min_int = int(height_min)
-                profiles = profiles.filter(height__regex=r'^\d+$').filter(
-                    height__gte=str(height_min_int))
-            except ValueError:
-                pass
+            lookups['height_cm__gte'] = parse_height_param('height_min', height_min)
         if height_max:
-            try:
-                height_max_int = int(height_max)
-                profiles = profiles.filter(height__regex=r'^\d+$').filter(
-                    height__lte=str(height_max_int))
-            except ValueError:
-                pass
+            lookups['height_cm__lte'] = parse_height_param('height_max', height_max)
 
-        # Annotate profiles with calculated age
-        profiles = profiles.filter(birth_date__isnull=False).annotate(
-            age=ExpressionWrapper(
-                ExtractYear(Now()) - ExtractYear('birth_date'),
-                output_field=IntegerField()
-            )
-        )
+        # Profiles without a birth date have never been listed in search results
+        lookups['birth_date__isnull'] = False
 
+        # Age bounds become a birth_date range, so the filter can use the birth_date index
         if age_min:
             try:
-                profiles = profiles.filter(age__gte=int(age_min))
+                lookups['birth_date__lte'] = birth_date_range(age_min=int(age_min))[1]
             except ValueError:
                 pass
         if age_max:
             try:
-                profiles = profiles.filter(age__lte=int(age_max))
+                lookups['birth_date__gte'] = birth_date_range(age_max=int(age_max))[0]
             except ValueError:
                 pass
 
-        # Serialize the profiles
-        serializer = UserProfileSerializer(profiles, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return lookups
+
+
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
+from accounts.permissions import MatchmakerPermission
+from core import matchmaking
+from profiles.serializers import ProfileCardSerializer
+
+
+class OpponentSuggestionAPIView(APIView):
+    permission_classes = [IsAuthenticated, MatchmakerPermission]
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('k', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description="Number of opponents to suggest, 10 by default"),
+    ])
+    def get(self, request, username):
+        """
+        The available fighters closest to `username` in weight, height, age, experience and
+        approved record, nearest first.
+        """
+        profiles = UserProfile.objects.select_related('user', 'stats')
+        profile = get_object_or_404(profiles, user__username=username)
+
+        try:
+            k = int(request.GET.get('k', 10))
+        except ValueError:
+            raise ValidationError({'k': "Expected a whole number."})
+        if not 1 <= k <= settings.MATCHMAKING_MAX_SUGGESTIONS:
+            raise ValidationError({'k': f"Expected a number between 1 and {settings.MATCHMAKING_MAX_SUGGESTIONS}."})
+
+        suggestions = matchmaking.suggest_opponents(profile, k)
+        # The index may lag behind a status change, so availability is checked again on load
+        loaded = profiles.filter(is_verified=True, status__in=matchmaking.AVAILABLE_STATUSES).in_bulk(
+            [profile_id for _, profile_id in suggestions])
+        opponents = [loaded[profile_id] for _, profile_id in suggestions if profile_id in loaded]
+        distances = {profile_id: distance for distance, profile_id in suggestions}
+
+        context = {'request': request}
+        cards = ProfileCardSerializer(opponents, many=True, context=context).data
+        return Response({
+            'fighter': ProfileCardSerializer(profile, context=context).data,
+            'suggestions': [
+                {**card, 'distance': round(distances[card['id']], 3)} for card in cards
+            ],
+        })
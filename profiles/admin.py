@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Post, FightRecord
+from .models import Post, FightRecord, FightStats, RatingHistory
 
 # Register your models here.
 admin.site.register(Post)
-admin.site.register(FightRecord)
\ No newline at end of file
+admin.site.register(FightRecord)
+admin.site.register(FightStats)
+admin.site.register(RatingHistory)
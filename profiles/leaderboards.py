@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+
+from accounts.models import UserProfile
+from .models import LeaderboardEntry
+
+# Scores a leaderboard can be sorted by, all LeaderboardEntry columns
+SORT_FIELDS = ('wins', 'win_rate', 'rating')
+
+# Profile fields a change to which can move the profile between leaderboards
+PROFILE_FIELDS = {'is_verified', 'weight', 'sport', 'sport_norm'}
+
+ENTRY_FIELDS = ('id', 'is_verified', 'weight', 'sport_norm',
+                'stats__wins', 'stats__losses', 'stats__draws', 'stats__rating')
+
+
+def weight_class(weight):
+    return int(weight) // settings.LEADERBOARD_WEIGHT_CLASS_KG
+
+
+def entry_rows(profiles=None):
+    return (UserProfile.objects.all() if profiles is None else profiles).values(*ENTRY_FIELDS)
+
+
+def build_entry(row):
+    """
+    The LeaderboardEntry of an entry_rows() row, or None when the profile is on no leaderboard.
+    """
+    wins, losses, draws = row['stats__wins'] or 0, row['stats__losses'] or 0, row['stats__draws'] or 0
+    fights = wins + losses + draws
+    if not (row['is_verified'] and row['weight'] is not None and row['sport_norm'] and fights):
+        return None
+    return LeaderboardEntry(
+        user_profile_id=row['id'],
+        sport=row['sport_norm'],
+        weight_class=weight_class(row['weight']),
+        wins=wins,
+        fights=fights,
+        win_rate=wins / fights,
+        rating=row['stats__rating'],
+    )
+
+
+def refresh_entry(profile_id):
+    """
+    Writes, moves or removes the leaderboard entry of a single profile. Called from
+    profiles.signals on fight stats changes (record approval, rating) and profile changes.
+    """
+    rows = list(entry_rows(UserProfile.objects.filter(pk=profile_id)))
+    entry = build_entry(rows[0]) if rows else None
+    if entry is None:
+        LeaderboardEntry.objects.filter(pk=profile_id).delete()
+    else:
+        entry.save()
+
+
+def rebuild(chunk_size=1000):
+    """
+    Recomputes the whole LeaderboardEntry table one id range of profiles at a time, so memory
+    stays bounded by `chunk_size`. Needed after bulk writes that send no signals, such as
+    replay_ratings. Returns the number of entries written.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        rows = list(entry_rows(UserProfile.objects.filter(id__gt=last_id).order_by('id'))[:chunk_size])
+        if not rows:
+            break
+        entries = [entry for entry in map(build_entry, rows) if entry is not None]
+        with transaction.atomic():
+            # Replaces every entry of the id range, so fighters that dropped off are removed too
+            LeaderboardEntry.objects.filter(pk__gt=last_id, pk__lte=rows[-1]['id']).delete()
+            LeaderboardEntry.objects.bulk_create(entries)
+        last_id = rows[-1]['id']
+        written += len(entries)
+
+    LeaderboardEntry.objects.filter(pk__gt=last_id).delete()
+    return written
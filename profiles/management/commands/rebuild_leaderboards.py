@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from profiles.leaderboards import rebuild
+
+
+class Command(BaseCommand):
+    help = ("Recomputes the LeaderboardEntry table from profiles and their fight stats, one id "
+            "range of profiles at a time so memory stays bounded by the chunk size.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of profiles recomputed per batch.')
+
+    def handle(self, *args, **options):
+        written = rebuild(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} leaderboard entries."))
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from accounts.models import UserProfile
+from profiles.models import Post, Like, Comment
+
+
+class Command(BaseCommand):
+    help = ("Recomputes Post.likes_count/comments_count and UserProfile.total_likes/total_comments "
+            "from the Like and Comment tables, chunk by chunk, to repair drifted counters.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of posts or profiles recomputed per query batch.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts_fixed = self.recount_posts(chunk_size)
+        profiles_fixed = self.recount_profiles(chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Repaired counters on {posts_fixed} posts and {profiles_fixed} profiles."
+        ))
+
+    def recount_posts(self, chunk_size):
+        fixed = 0
+        last_id = 0
+        while True:
+            posts = list(Post.objects.filter(id__gt=last_id).order_by('id')
+                         .only('id', 'likes_count', 'comments_count')[:chunk_size])
+            if not posts:
+                return fixed
+            last_id = posts[-1].id
+            ids = [post.id for post in posts]
+
+            likes = dict(Like.objects.filter(post_id__in=ids).order_by().values('post_id')
+                         .annotate(n=Count('id')).values_list('post_id', 'n'))
+            comments = dict(Comment.objects.filter(post_id__in=ids).order_by().values('post_id')
+                            .annotate(n=Count('id')).values_list('post_id', 'n'))
+
+            drifted = []
+            for post in posts:
+                likes_count, comments_count = likes.get(post.id, 0), comments.get(post.id, 0)
+                if (post.likes_count, post.comments_count) != (likes_count, comments_count):
+                    post.likes_count, post.comments_count = likes_count, comments_count
+                    drifted.append(post)
+            with transaction.atomic():
+                Post.objects.bulk_update(drifted, ['likes_count', 'comments_count'])
+            fixed += len(drifted)
+
+    def recount_profiles(self, chunk_size):
+        # Runs after recount_posts, so the per post columns can be summed directly
+        fixed = 0
+        last_id = 0
+        while True:
+            profiles = list(UserProfile.objects.filter(id__gt=last_id).order_by('id')
+                            .only('id', 'user_id', 'total_likes', 'total_comments')[:chunk_size])
+            if not profiles:
+                return fixed
+            last_id = profiles[-1].id
+
+            totals = {
+                row['user_id']: row
+                for row in Post.objects.filter(user_id__in=[profile.user_id for profile in profiles])
+                .order_by().values('user_id')
+                .annotate(likes=Sum('likes_count'), comments=Sum('comments_count'))
+            }
+
+            drifted = []
+            for profile in profiles:
+                row = totals.get(profile.user_id, {})
+                total_likes, total_comments = row.get('likes', 0), row.get('comments', 0)
+                if (profile.total_likes, profile.total_comments) != (total_likes, total_comments):
+                    profile.total_likes, profile.total_comments = total_likes, total_comments
+                    drifted.append(profile)
+            with transaction.atomic():
+                UserProfile.objects.bulk_update(drifted, ['total_likes', 'total_comments'])
+            fixed += len(drifted)
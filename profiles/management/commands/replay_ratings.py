@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from profiles import leaderboards
+from profiles.models import DEFAULT_RATING, FightRecord, FightStats, RatingHistory
+from profiles.ratings import opponent_profile_ids, rate
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds every rating and the rating history by replaying all approved FightRecords "
+            "oldest first, reading them chunk by chunk.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Number of fight records read and history rows written per batch.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        with transaction.atomic():
+            RatingHistory.objects.all().delete()
+            FightStats.objects.update(rating=DEFAULT_RATING)
+            ratings = self.replay(chunk_size)
+            FightStats.objects.bulk_update(
+                [FightStats(user_profile_id=profile_id, rating=rating) for profile_id, rating in ratings.items()],
+                ['rating'], batch_size=chunk_size
+            )
+        # The updates above send no post_save, so the leaderboards' copy of the ratings is refreshed here
+        leaderboards.rebuild(chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Replayed ratings of {len(ratings)} profiles."))
+
+    def replay(self, chunk_size):
+        # Only the ratings themselves are kept in memory; records are read in (created_at, id)
+        # keyset chunks off the approved records index
+        ratings = {}
+        opponents = {}
+        records = (FightRecord.objects.filter(is_approved=True).order_by('created_at', 'id')
+                   .values_list('id', 'created_at', 'user_profile_id', 'opponent_name', 'status'))
+        last = None
+        while True:
+            chunk = records
+            if last:
+                chunk = chunk.filter(Q(created_at__gt=last[1]) | Q(created_at=last[1], id__gt=last[0]))
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return ratings
+            last = chunk[-1]
+
+            unseen = {row[3] for row in chunk} - opponents.keys()
+            resolved = opponent_profile_ids(unseen)
+            opponents.update({name: resolved.get(name) for name in unseen})
+
+            history = []
+            for record_id, _, profile_id, opponent_name, status in chunk:
+                before = ratings.get(profile_id, DEFAULT_RATING)
+                opponent_id = opponents[opponent_name]
+                opponent_rating = DEFAULT_RATING
+                if opponent_id is not None and opponent_id != profile_id:
+                    opponent_rating = ratings.get(opponent_id, DEFAULT_RATING)
+                ratings[profile_id] = rate(before, opponent_rating, status)
+                history.append(RatingHistory(user_profile_id=profile_id, fight_record_id=record_id,
+                                             opponent_rating=opponent_rating, rating_before=before,
+                                             rating_after=ratings[profile_id]))
+            RatingHistory.objects.bulk_create(history)
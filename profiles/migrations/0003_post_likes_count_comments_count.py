@@ -0,0 +1,47 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('profiles', 'Post')
+    Like = apps.get_model('profiles', 'Like')
+    Comment = apps.get_model('profiles', 'Comment')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+
+    def count_for_post(model):
+        return Coalesce(Subquery(
+            model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('id')).values('n')
+        ), Value(0))
+
+    def sum_for_user(field):
+        return Coalesce(Subquery(
+            Post.objects.filter(user=OuterRef('user')).order_by().values('user').annotate(n=Sum(field)).values('n')
+        ), Value(0))
+
+    Post.objects.update(likes_count=count_for_post(Like), comments_count=count_for_post(Comment))
+    UserProfile.objects.update(total_likes=sum_for_user('likes_count'), total_comments=sum_for_user('comments_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_total_likes_total_comments'),
+        ('profiles', '0002_comment_fightrecord_like_post_image_post_video_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def backfill_fight_stats(apps, schema_editor):
+    FightRecord = apps.get_model('profiles', 'FightRecord')
+    FightStats = apps.get_model('profiles', 'FightStats')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+
+    totals = {
+        row.pop('user_profile_id'): row
+        for row in FightRecord.objects.filter(is_approved=True).order_by().values('user_profile_id').annotate(
+            wins=Count('id', filter=Q(status='WIN')),
+            losses=Count('id', filter=Q(status='LOSE')),
+            draws=Count('id', filter=Q(status='DRAW')),
+            last_fight_at=Max('created_at'),
+        )
+    }
+    FightStats.objects.bulk_create(
+        (FightStats(user_profile_id=profile_id, **totals.get(profile_id, {}))
+         for profile_id in UserProfile.objects.values_list('id', flat=True).iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_total_likes_total_comments'),
+        ('profiles', '0003_post_likes_count_comments_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FightStats',
+            fields=[
+                ('user_profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='accounts.userprofile')),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('draws', models.PositiveIntegerField(default=0)),
+                ('last_fight_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_fight_stats, migrations.RunPython.noop),
+    ]
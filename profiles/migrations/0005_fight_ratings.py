@@ -0,0 +1,48 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_userprofile_normalized_fields'),
+        ('profiles', '0004_fightstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('opponent_rating', models.FloatField()),
+                ('rating_before', models.FloatField()),
+                ('rating_after', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='fightstats',
+            name='rating',
+            field=models.FloatField(db_index=True, default=1500.0),
+        ),
+        migrations.AddIndex(
+            model_name='fightrecord',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['created_at', 'id'], name='fight_record_approved_idx'),
+        ),
+        migrations.AddField(
+            model_name='ratinghistory',
+            name='fight_record',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_change', to='profiles.fightrecord'),
+        ),
+        migrations.AddField(
+            model_name='ratinghistory',
+            name='user_profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_history', to='accounts.userprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='ratinghistory',
+            index=models.Index(fields=['user_profile', '-id'], name='rating_history_profile_idx'),
+        ),
+    ]
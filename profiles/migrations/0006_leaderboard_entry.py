@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_leaderboard(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    LeaderboardEntry = apps.get_model('profiles', 'LeaderboardEntry')
+
+    rows = UserProfile.objects.filter(is_verified=True, weight__isnull=False).exclude(sport_norm='').values_list(
+        'id', 'weight', 'sport_norm', 'stats__wins', 'stats__losses', 'stats__draws', 'stats__rating'
+    )
+    LeaderboardEntry.objects.bulk_create(
+        (LeaderboardEntry(user_profile_id=profile_id, sport=sport,
+                          weight_class=weight // settings.LEADERBOARD_WEIGHT_CLASS_KG,
+                          wins=wins, fights=wins + losses + draws, win_rate=wins / (wins + losses + draws),
+                          rating=rating)
+         for profile_id, weight, sport, wins, losses, draws, rating in rows.iterator()
+         if wins is not None and wins + losses + draws),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_userprofile_normalized_fields'),
+        ('profiles', '0005_fight_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('user_profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to='accounts.userprofile')),
+                ('sport', models.CharField(max_length=100)),
+                ('weight_class', models.IntegerField()),
+                ('wins', models.PositiveIntegerField()),
+                ('fights', models.PositiveIntegerField()),
+                ('win_rate', models.FloatField()),
+                ('rating', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sport', 'weight_class', '-wins', '-user_profile'], name='leaderboard_wins_idx'), models.Index(fields=['sport', 'weight_class', '-win_rate', '-user_profile'], name='leaderboard_win_rate_idx'), models.Index(fields=['sport', 'weight_class', '-rating', '-user_profile'], name='leaderboard_rating_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
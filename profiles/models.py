@@ -1,6 +1,7 @@
 # models.py
 
 from django.db import models
+from django.db.models import Count, Max, Q
 from accounts.models import CustomUser, UserProfile
 from django.conf import settings
 
@@ -12,6 +13,24 @@ class Post(models.Model):
     video = models.FileField(upload_to='post_videos/', blank=True, null=True)  # Optional video field
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in sync with F() updates by the like/comment views
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    COUNTER_FIELDS = ('likes_count', 'comments_count')
+
+    class Meta:
+        indexes = [
+            # Backs the (created_at, id) keyset pagination of the feeds
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            # As in UserProfile.save: a full save must not write back counters loaded before a
+            # concurrent like or comment
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+        super().save(*args, **kwargs)
 
 class Like(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -44,3 +63,104 @@ class FightRecord(models.Model):
     weight = models.DecimalField(max_digits=5, decimal_places=2)
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Approved records in the order profiles.ratings replays them
+            models.Index(fields=['created_at', 'id'], condition=Q(is_approved=True),
+                         name='fight_record_approved_idx'),
+        ]
+
+
+def aggregate_fight_stats(records):
+    """
+    Counts wins, losses and draws of the approved records in `records` with a single
+    conditional aggregation query.
+    """
+    return records.filter(is_approved=True).aggregate(
+        wins=Count('id', filter=Q(status='WIN')),
+        losses=Count('id', filter=Q(status='LOSE')),
+        draws=Count('id', filter=Q(status='DRAW')),
+        last_fight_at=Max('created_at'),
+    )
+
+
+# Rating of a profile without approved fights, and of opponents that aren't registered fighters
+DEFAULT_RATING = 1500.0
+
+
+class FightStats(models.Model):
+    """
+    Materialized approved fight record of a profile, refreshed by profiles.signals
+    whenever one of its FightRecords is created, approved, changed or deleted.
+    """
+    user_profile = models.OneToOneField('accounts.UserProfile', on_delete=models.CASCADE,
+                                        primary_key=True, related_name='stats')
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    last_fight_at = models.DateTimeField(null=True, blank=True)
+    # Elo rating, moved by profiles.ratings on every approval
+    rating = models.FloatField(default=DEFAULT_RATING, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.wins} - {self.draws} - {self.losses}"
+
+    @classmethod
+    def refresh(cls, user_profile_id):
+        values = aggregate_fight_stats(FightRecord.objects.filter(user_profile_id=user_profile_id))
+        stats, created = cls.objects.update_or_create(user_profile_id=user_profile_id, defaults=values)
+        return stats
+
+    @classmethod
+    def for_profile(cls, user_profile):
+        # Falls back to computing (and storing) the row for profiles that don't have one yet
+        try:
+            return user_profile.stats
+        except cls.DoesNotExist:
+            return cls.refresh(user_profile.pk)
+
+
+class RatingHistory(models.Model):
+    """
+    One rating change of a profile: the approved FightRecord that caused it, the opponent's
+    rating it was scored against and the rating before and after.
+    """
+    user_profile = models.ForeignKey('accounts.UserProfile', on_delete=models.CASCADE,
+                                     related_name='rating_history')
+    fight_record = models.OneToOneField('FightRecord', on_delete=models.CASCADE, related_name='rating_change')
+    opponent_rating = models.FloatField()
+    rating_before = models.FloatField()
+    rating_after = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_profile', '-id'], name='rating_history_profile_idx'),
+        ]
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Leaderboard row of a verified fighter with a sport, a weight and at least one approved
+    fight, kept up to date by profiles.leaderboards. A leaderboard is the (sport, weight_class)
+    slice of this table, read in score order through one of the indexes below.
+    """
+    user_profile = models.OneToOneField('accounts.UserProfile', on_delete=models.CASCADE,
+                                        primary_key=True, related_name='leaderboard_entry')
+    # UserProfile.sport_norm
+    sport = models.CharField(max_length=100)
+    weight_class = models.IntegerField()
+    wins = models.PositiveIntegerField()
+    fights = models.PositiveIntegerField()
+    win_rate = models.FloatField()
+    rating = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sport', 'weight_class', '-wins', '-user_profile'], name='leaderboard_wins_idx'),
+            models.Index(fields=['sport', 'weight_class', '-win_rate', '-user_profile'],
+                         name='leaderboard_win_rate_idx'),
+            models.Index(fields=['sport', 'weight_class', '-rating', '-user_profile'], name='leaderboard_rating_idx'),
+        ]
@@ -0,0 +1,57 @@
+from django.db import transaction
+
+from accounts.models import UserProfile
+from .models import DEFAULT_RATING, FightStats, RatingHistory
+
+# Most a single fight can move a rating by
+K_FACTOR = 32
+SCORES = {'WIN': 1.0, 'DRAW': 0.5, 'LOSE': 0.0}
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def rate(rating, opponent_rating, status):
+    return rating + K_FACTOR * (SCORES[status] - expected_score(rating, opponent_rating))
+
+
+def opponent_profile_ids(names):
+    """
+    Maps the FightRecord.opponent_name values in `names` that name a registered fighter
+    ("username" or "@username") to that fighter's profile id, in one query. Other opponents
+    are left out and rated as DEFAULT_RATING.
+    """
+    usernames = {name: name.strip().lstrip('@') for name in names}
+    profiles = dict(UserProfile.objects.filter(user__username__in=set(usernames.values()))
+                    .values_list('user__username', 'id'))
+    return {name: profiles[username] for name, username in usernames.items() if username in profiles}
+
+
+def apply_record(record):
+    """
+    Moves the rating of the record's fighter by the result of one approved fight and logs the
+    change. Only the record's own fighter is rated; the opponent's side of the fight is their
+    own record. A record already in the history is skipped, so approving twice counts once.
+    """
+    opponent_id = opponent_profile_ids([record.opponent_name]).get(record.opponent_name)
+    with transaction.atomic():
+        FightStats.objects.get_or_create(user_profile_id=record.user_profile_id)
+        stats = FightStats.objects.select_for_update().get(user_profile_id=record.user_profile_id)
+        if RatingHistory.objects.filter(fight_record=record).exists():
+            return stats
+
+        opponent_rating = None
+        if opponent_id is not None and opponent_id != record.user_profile_id:
+            opponent_rating = (FightStats.objects.filter(user_profile_id=opponent_id)
+                               .values_list('rating', flat=True).first())
+        if opponent_rating is None:
+            opponent_rating = DEFAULT_RATING
+
+        rating = rate(stats.rating, opponent_rating, record.status)
+        RatingHistory.objects.create(user_profile_id=record.user_profile_id, fight_record=record,
+                                     opponent_rating=opponent_rating, rating_before=stats.rating,
+                                     rating_after=rating)
+        stats.rating = rating
+        stats.save(update_fields=['rating', 'updated_at'])
+    return stats
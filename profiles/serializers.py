@@ -1,8 +1,11 @@
+from django.conf import settings
+from django.db.models import Prefetch, OuterRef, Subquery
 from rest_framework import serializers
 
 from accounts.serializers import UserProfileSerializer, PromotionProfileSerializer
-from .models import Post, Comment, Like, FightRecord
-from accounts.models import CustomUser, UserProfile, Favourite, PromotionProfile
+from .models import Post, Comment, FightRecord, FightStats, LeaderboardEntry
+from accounts.models import CustomUser, UserProfile, SubStatus
+from core.serializers import ViewerStateListSerializer, DynamicFieldsMixin, get_viewer_state
 
 class CommentSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
@@ -36,28 +39,40 @@ class CommentSerializer(serializers.ModelSerializer):
 #             raise serializers.ValidationError("An image or video is required to create a post.")
 #         return data
 
+def latest_comments_prefetch(lookup='comments'):
+    # Window-limited prefetch: at most POST_COMMENTS_PREVIEW_SIZE comments per post in one query
+    queryset = Comment.objects.select_related('user__profile').order_by('-created_at', '-id')
+    return Prefetch(lookup, queryset=queryset[:settings.POST_COMMENTS_PREVIEW_SIZE], to_attr='latest_comments')
+
+
 class PostSerializer(serializers.ModelSerializer):
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
     is_liked = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
     author = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = ['id', 'title', 'content', 'image', 'video', 'created_at',
                   'updated_at', 'likes_count', 'comments_count', 'is_liked', 'comments', 'author']
+        list_serializer_class = ViewerStateListSerializer
 
-    def get_likes_count(self, obj):
-        return obj.likes.count()
+    def load_viewer_state(self, posts, state):
+        state.load_posts(post.pk for post in posts)
 
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+    def get_comments(self, obj):
+        # Only a preview is embedded, the full thread is paginated by PostCommentListView
+        comments = getattr(obj, 'latest_comments', None)
+        if comments is None:
+            comments = obj.comments.select_related('user__profile').order_by(
+                '-created_at', '-id')[:settings.POST_COMMENTS_PREVIEW_SIZE]
+        return CommentSerializer(comments, many=True, context=self.context).data
 
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(user=request.user).exists()
+        state = get_viewer_state(self.context)
+        if state is not None:
+            return state.is_liked(obj.pk)
         return False
 
     def get_author(self, obj):
@@ -90,13 +105,28 @@ class FightRecordSerializer(serializers.ModelSerializer):
         return "Подтвержден" if obj.is_approved else "На рассмотрении"
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+def with_latest_substatus(queryset):
+    # Annotates the newest substatus message of each profile instead of querying it per profile
+    latest = SubStatus.objects.filter(user_profile=OuterRef('pk')).order_by('-created_at', '-id')
+    return queryset.annotate(latest_substatus=Subquery(latest.values('message')[:1]))
+
+
+def posts_prefetch(lookup='user__posts'):
+    # The author block of every post reads post.user and post.user.profile
+    return Prefetch(lookup, queryset=Post.objects.select_related('user__profile').order_by('-created_at'))
+
+
+def fight_records_prefetch(lookup='fight_records'):
+    return Prefetch(lookup, queryset=FightRecord.objects.order_by('-created_at'), to_attr='ordered_fight_records')
+
+
+class UserProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     posts = PostSerializer(many=True, read_only=True, source='user.posts')
     substatus = serializers.SerializerMethodField()
     is_favourite = serializers.SerializerMethodField()
-    total_likes = serializers.SerializerMethodField()
-    total_comments = serializers.SerializerMethodField()
+    total_likes = serializers.IntegerField(read_only=True)
+    total_comments = serializers.IntegerField(read_only=True)
     fight_records = serializers.SerializerMethodField()
     fight_stats = serializers.SerializerMethodField()
 
@@ -108,6 +138,15 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'substatus', 'posts', 'is_favourite', 'total_likes', 'total_comments', 'fight_records', 'fight_stats'
         ]
         ref_name = "ProfilesUserProfile"
+        list_serializer_class = ViewerStateListSerializer
+        # Only rendered when requested once a client narrows the output with ?fields=
+        expandable_fields = ['posts', 'fight_records']
+
+    def load_viewer_state(self, profiles, state):
+        state.load_profiles(profile.pk for profile in profiles)
+        # Resolve the nested posts of the whole page at once as well
+        if 'posts' in self.fields:
+            state.load_posts(post.pk for profile in profiles for post in profile.user.posts.all())
 
     def get_profile_picture(self, obj):
         if obj.profile_picture:
@@ -118,50 +157,66 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return None
 
     def get_substatus(self, obj):
+        if hasattr(obj, 'latest_substatus'):
+            return obj.latest_substatus or obj.status
         latest_substatus = obj.substatuses.order_by('-created_at').first()
         return latest_substatus.message if latest_substatus else obj.status
 
     def get_is_favourite(self, obj):
-        request = self.context.get('request', None)
-        if request is None or not request.user.is_authenticated:
+        state = get_viewer_state(self.context)
+        if state is None:
             return False
-        return Favourite.objects.filter(user=request.user, favourite_profile=obj).exists()
-
-    def get_total_likes(self, obj):
-        return Like.objects.filter(post__user=obj.user).count()
-
-    def get_total_comments(self, obj):
-        return Comment.objects.filter(post__user=obj.user).count()
+        return state.is_favourite(obj.pk)
 
     def get_fight_records(self, obj):
         if not obj.user.is_verified:
             return None
 
         # Get all fight records for verified users, both approved and pending
-        records = FightRecord.objects.filter(user_profile=obj).order_by('-created_at')
+        records = getattr(obj, 'ordered_fight_records', None)
+        if records is None:
+            records = FightRecord.objects.filter(user_profile=obj).order_by('-created_at')
 
         # Show all records to the owner and admins, but only approved records to others
         request = self.context.get('request')
-        if request:
-            if request.user.is_staff or request.user == obj.user:
-                return FightRecordSerializer(records, many=True).data
-            return FightRecordSerializer(records.filter(is_approved=True), many=True).data
-
-        return FightRecordSerializer(records.filter(is_approved=True), many=True).data
+        if request and (request.user.is_staff or request.user == obj.user):
+            return FightRecordSerializer(records, many=True).data
+        return FightRecordSerializer([record for record in records if record.is_approved], many=True).data
 
     def get_fight_stats(self, obj):
         if not obj.user.is_verified:
             return None
+        return str(FightStats.for_profile(obj))
 
-        # Get approved fight records for verified users
-        approved_records = FightRecord.objects.filter(user_profile=obj, is_approved=True)
 
-        # Count wins, losses and ties
-        wins = approved_records.filter(status='WIN').count()
-        losses = approved_records.filter(status='LOSS').count()
-        ties = approved_records.filter(status='TIE').count()
+class ProfileCardSerializer(serializers.ModelSerializer):
+    """
+    Compact representation used by profile lists: what a card needs, without posts,
+    fight records or counters.
+    """
+    username = serializers.CharField(source='user.username', read_only=True)
+    is_favourite = serializers.SerializerMethodField()
+    fight_stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserProfile
+        fields = ['id', 'username', 'full_name', 'profile_picture', 'weight', 'height', 'sport', 'city',
+                  'country', 'status', 'is_verified', 'fight_stats', 'is_favourite']
+        list_serializer_class = ViewerStateListSerializer
+
+    def load_viewer_state(self, profiles, state):
+        state.load_profiles(profile.pk for profile in profiles)
+
+    def get_is_favourite(self, obj):
+        state = get_viewer_state(self.context)
+        if state is None:
+            return False
+        return state.is_favourite(obj.pk)
 
-        return f"{wins} - {ties} - {losses}"
+    def get_fight_stats(self, obj):
+        if not obj.user.is_verified:
+            return None
+        return str(FightStats.for_profile(obj))
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -216,6 +271,10 @@ class VerifiedUserProfileSerializer(serializers.ModelSerializer):
 
 
 class CombinedUserProfileSerializer(serializers.ModelSerializer):
+    """
+    The profile page. Expects the user to come from UserProfileView's queryset, where the
+    profile, promotion profile, posts and fight records are already joined or prefetched.
+    """
     profile = serializers.SerializerMethodField()
     posts = PostSerializer(many=True, read_only=True)
 
@@ -225,21 +284,41 @@ class CombinedUserProfileSerializer(serializers.ModelSerializer):
             'username', 'phone_number', 'is_verified', 'is_promotion', 'creator', 'profile', 'posts'
         ]
 
+    def to_representation(self, instance):
+        self.profile_embeds_posts = False
+        data = super().to_representation(instance)
+        # profile.posts is the same list as the top-level posts, so it is serialized only once
+        if self.profile_embeds_posts:
+            data['profile']['posts'] = data['posts']
+        return data
+
     def get_profile(self, obj):
         user_profile_data = None
         promotion_profile_data = None
 
         if obj.is_promotion:
-            promotion_profile = PromotionProfile.objects.filter(user=obj).first()
+            promotion_profile = getattr(obj, 'promotion_profile', None)
             if promotion_profile:
-                promotion_profile_data = PromotionProfileSerializer(promotion_profile).data
+                promotion_profile_data = PromotionProfileSerializer(promotion_profile, context=self.context).data
 
-        user_profile = UserProfile.objects.filter(user=obj).first()
+        user_profile = getattr(obj, 'profile', None)
         if user_profile:
-            user_profile_data = UserProfileSerializer(user_profile).data
+            profile_serializer = UserProfileSerializer(user_profile, context=self.context)
+            self.profile_embeds_posts = profile_serializer.fields.pop('posts', None) is not None
+            user_profile_data = profile_serializer.data
 
         if promotion_profile_data:
             return {**user_profile_data, **promotion_profile_data} if user_profile_data else promotion_profile_data
         return user_profile_data
 
 
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    # Expects user_profile__user to be joined, see LeaderboardView
+    username = serializers.CharField(source='user_profile.user.username', read_only=True)
+    full_name = serializers.CharField(source='user_profile.full_name', read_only=True)
+    profile_picture = serializers.ImageField(source='user_profile.profile_picture', read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['username', 'full_name', 'profile_picture', 'sport', 'weight_class', 'wins', 'fights',
+                  'win_rate', 'rating']
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import UserProfile
+from .leaderboards import PROFILE_FIELDS, refresh_entry
+from .models import FightRecord, FightStats
+
+
+@receiver(post_save, sender=UserProfile)
+def create_fight_stats(sender, instance, created, **kwargs):
+    # Every profile gets its (empty) stats row up front so readers never hit the fallback
+    if created:
+        FightStats.objects.get_or_create(user_profile=instance)
+
+
+@receiver(post_save, sender=FightRecord)
+def refresh_fight_stats(sender, instance, **kwargs):
+    FightStats.refresh(instance.user_profile_id)
+
+
+@receiver(post_delete, sender=FightRecord)
+def refresh_fight_stats_on_delete(sender, instance, origin=None, **kwargs):
+    # When the whole profile is being deleted its stats row goes with it
+    if isinstance(origin, FightRecord) or (hasattr(origin, 'model') and origin.model is FightRecord):
+        FightStats.refresh(instance.user_profile_id)
+
+
+@receiver(post_save, sender=FightStats)
+def update_leaderboard_entry(sender, instance, **kwargs):
+    refresh_entry(instance.user_profile_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def update_leaderboard_entry_on_profile_change(sender, instance, created, update_fields=None, **kwargs):
+    # New profiles have no approved fights yet, and most saves (counters, bio) can't move them
+    if created or (update_fields is not None and not PROFILE_FIELDS & set(update_fields)):
+        return
+    refresh_entry(instance.pk)
@@ -1,3 +1,177 @@
-from django.test import TestCase
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import CustomUser, UserProfile
+from . import leaderboards
+from .models import DEFAULT_RATING, FightRecord, FightStats, LeaderboardEntry, Post, RatingHistory
+from .ratings import K_FACTOR, apply_record, rate
+
+
+class RateTests(SimpleTestCase):
+    def test_even_fight(self):
+        self.assertEqual(rate(DEFAULT_RATING, DEFAULT_RATING, 'WIN'), DEFAULT_RATING + K_FACTOR / 2)
+        self.assertEqual(rate(DEFAULT_RATING, DEFAULT_RATING, 'DRAW'), DEFAULT_RATING)
+        self.assertEqual(rate(DEFAULT_RATING, DEFAULT_RATING, 'LOSE'), DEFAULT_RATING - K_FACTOR / 2)
+
+    def test_upset_moves_more(self):
+        favourite_win = rate(1800, 1400, 'WIN') - 1800
+        underdog_win = rate(1400, 1800, 'WIN') - 1400
+        self.assertLess(favourite_win, underdog_win)
+        self.assertAlmostEqual(favourite_win + underdog_win, K_FACTOR)
+
+
+class ApplyRecordTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fighter = CustomUser.objects.create_user(username='fighter', password='x', phone_number='+70000000001')
+        cls.opponent = CustomUser.objects.create_user(username='opponent', password='x', phone_number='+70000000002')
+
+    def record(self, opponent_name, status='WIN'):
+        return FightRecord.objects.create(user_profile=self.fighter.profile, opponent_name=opponent_name,
+                                          status=status, promotion='Promotion', weight_category='Lightweight',
+                                          weight=70, is_approved=True)
+
+    def test_approving_twice_counts_once(self):
+        record = self.record('Someone unregistered')
+        apply_record(record)
+        apply_record(record)
+
+        self.assertEqual(RatingHistory.objects.filter(fight_record=record).count(), 1)
+        self.assertEqual(FightStats.objects.get(user_profile=self.fighter.profile).rating,
+                         rate(DEFAULT_RATING, DEFAULT_RATING, 'WIN'))
+
+    def test_registered_opponent_rating(self):
+        FightStats.objects.update_or_create(user_profile=self.opponent.profile, defaults={'rating': 1700})
+        change = apply_record(self.record('@opponent', status='LOSE')).user_profile.rating_history.get()
+
+        self.assertEqual(change.opponent_rating, 1700)
+        self.assertEqual(change.rating_after, rate(DEFAULT_RATING, 1700, 'LOSE'))
+
+
+class PostCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(username='author', password=None, phone_number='+70000000001')
+        cls.reader = CustomUser.objects.create_user(username='reader', password=None, phone_number='+70000000002')
+
+    def setUp(self):
+        self.post = Post.objects.create(user=self.author, title='Post')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assertCounters(self, likes, comments):
+        post = Post.objects.get(pk=self.post.pk)
+        profile = UserProfile.objects.get(user=self.author)
+        self.assertEqual((post.likes_count, post.comments_count), (likes, comments))
+        self.assertEqual((profile.total_likes, profile.total_comments), (likes, comments))
+
+    def test_like_and_unlike(self):
+        self.assertEqual(self.client.post(f'/api/profiles/posts/{self.post.pk}/like/').data, {'status': 'liked'})
+        self.assertCounters(likes=1, comments=0)
+        self.assertEqual(self.client.post(f'/api/profiles/posts/{self.post.pk}/like/').data, {'status': 'unliked'})
+        self.assertCounters(likes=0, comments=0)
+
+    def test_comment(self):
+        for _ in range(2):
+            response = self.client.post(f'/api/profiles/posts/{self.post.pk}/comment/', {'content': 'Nice'})
+            self.assertEqual(response.status_code, 201)
+        self.assertCounters(likes=0, comments=2)
+
+    def test_delete_post(self):
+        other = Post.objects.create(user=self.author, title='Other')
+        for post in (self.post, other):
+            self.client.post(f'/api/profiles/posts/{post.pk}/like/')
+            self.client.post(f'/api/profiles/posts/{post.pk}/comment/', {'content': 'Nice'})
+
+        author = APIClient()
+        author.force_authenticate(self.author)
+        self.assertEqual(author.delete(f'/api/profiles/posts/{self.post.pk}/delete/').status_code, 204)
+        profile = UserProfile.objects.get(user=self.author)
+        self.assertEqual((profile.total_likes, profile.total_comments), (1, 1))
+
+    def test_full_saves_keep_counters(self):
+        post, profile = Post.objects.get(pk=self.post.pk), UserProfile.objects.get(user=self.author)
+        self.client.post(f'/api/profiles/posts/{self.post.pk}/like/')
+
+        post.title = 'Edited'
+        post.save()
+        profile.city = 'Almaty'
+        profile.save()
+        self.assertCounters(likes=1, comments=0)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, 'Edited')
+
+    def test_update_view_keeps_counters(self):
+        Post.objects.filter(pk=self.post.pk).update(likes_count=F('likes_count') + 3)
+        author = APIClient()
+        author.force_authenticate(self.author)
+        response = author.patch(f'/api/profiles/posts/{self.post.pk}/update/', {'title': 'Edited'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes_count, 3)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.profiles = []
+        for number in range(8):
+            user = CustomUser.objects.create_user(username=f'fighter{number}', password=None,
+                                                  phone_number=f'+7000000{number:04d}')
+            profile = user.profile
+            profile.is_verified = number != 7
+            profile.weight = 60 + number * 3
+            profile.sport = ['Boxing', 'MMA'][number % 2]
+            profile.save()
+            if number != 6:
+                self.set_stats(profile, wins=number, losses=1, rating=1400 + number * 20)
+            self.profiles.append(profile)
+
+    def set_stats(self, profile, **values):
+        stats = FightStats.objects.get(user_profile=profile)
+        for field, value in values.items():
+            setattr(stats, field, value)
+        stats.save()
+
+    def entries(self):
+        return list(LeaderboardEntry.objects.order_by('pk').values())
+
+    def assertMatchesRebuild(self):
+        incremental = self.entries()
+        LeaderboardEntry.objects.all().delete()
+        leaderboards.rebuild(chunk_size=3)
+        self.assertEqual(self.entries(), incremental)
+
+    def test_entries(self):
+        entry = LeaderboardEntry.objects.get(pk=self.profiles[3].pk)
+        self.assertEqual((entry.sport, entry.weight_class, entry.wins, entry.fights, entry.rating),
+                         ('mma', 69 // 5, 3, 4, 1460))
+        self.assertAlmostEqual(entry.win_rate, 0.75)
+        # No approved fights, unverified
+        self.assertFalse(LeaderboardEntry.objects.filter(pk__in=[self.profiles[6].pk, self.profiles[7].pk]).exists())
+        self.assertMatchesRebuild()
+
+    def test_refresh_follows_changes(self):
+        moved, unverified, rated = self.profiles[1], self.profiles[2], self.profiles[4]
+        moved.weight, moved.sport = 100, 'Judo'
+        moved.save()
+        unverified.is_verified = False
+        unverified.save(update_fields=['is_verified'])
+        self.set_stats(rated, rating=1800)
+        self.set_stats(self.profiles[6], draws=1)
+
+        entry = LeaderboardEntry.objects.get(pk=moved.pk)
+        self.assertEqual((entry.sport, entry.weight_class), ('judo', 20))
+        self.assertFalse(LeaderboardEntry.objects.filter(pk=unverified.pk).exists())
+        self.assertEqual(LeaderboardEntry.objects.get(pk=rated.pk).rating, 1800)
+        self.assertTrue(LeaderboardEntry.objects.filter(pk=self.profiles[6].pk).exists())
+        self.assertMatchesRebuild()
+
+    def test_rebuild_after_unsignalled_writes(self):
+        FightStats.objects.filter(user_profile=self.profiles[5]).update(rating=2000)
+        FightStats.objects.filter(user_profile=self.profiles[0]).update(wins=0, losses=0)
+        LeaderboardEntry.objects.create(user_profile=self.profiles[7], sport='boxing', weight_class=0,
+                                        wins=1, fights=1, win_rate=1.0, rating=DEFAULT_RATING)
+
+        leaderboards.rebuild(chunk_size=3)
+        self.assertEqual(LeaderboardEntry.objects.get(pk=self.profiles[5].pk).rating, 2000)
+        self.assertFalse(LeaderboardEntry.objects.filter(pk__in=[self.profiles[0].pk, self.profiles[7].pk]).exists())
+        self.assertEqual(LeaderboardEntry.objects.count(), 5)
@@ -1,20 +1,49 @@
+from django.db import transaction
+from django.db.models import F, Prefetch
 from rest_framework import viewsets, permissions, generics, mixins
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import CreateAPIView, get_object_or_404
 from rest_framework.mixins import UpdateModelMixin
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from accounts.models import CustomUser, UserProfile, PromotionProfile
-from .models import Post, Like, FightRecord
+from accounts.utils import normalize_text
+from core.pagination import KeysetPagination, IdCursorPagination, LeaderboardPagination
+from .leaderboards import SORT_FIELDS, weight_class
+from .models import Post, Like, Comment, FightRecord, LeaderboardEntry
 from .serializers import UserProfileSerializer, PostSerializer, CustomUserSerializer, CombinedUserProfileSerializer, \
-    PromotionProfileSerializer, CommentSerializer, FightRecordSerializer
+    PromotionProfileSerializer, CommentSerializer, FightRecordSerializer, latest_comments_prefetch, with_latest_substatus, \
+    fight_records_prefetch, posts_prefetch, ProfileCardSerializer, LeaderboardEntrySerializer
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
 
 class ProfileListView(generics.ListAPIView):
-    queryset = UserProfile.objects.all().select_related('user').prefetch_related('user__posts')
-    serializer_class = UserProfileSerializer
+    pagination_class = IdCursorPagination
+
+    def get_serializer_class(self):
+        # Cards by default, the full profile once the client selects fields (?fields=/?expand=)
+        params = self.request.query_params
+        if 'fields' in params or 'expand' in params:
+            return UserProfileSerializer
+        return ProfileCardSerializer
+
+    def get_queryset(self):
+        # Every relation is joined or prefetched once per page, so the number of queries
+        # does not grow with the page size
+        queryset = UserProfile.objects.all().select_related('user', 'stats')
+        if self.get_serializer_class() is ProfileCardSerializer:
+            return queryset
+
+        # Only join and prefetch what the selected fields will render
+        fields = UserProfileSerializer.get_selected_fields(self.request)
+        if 'substatus' in fields:
+            queryset = with_latest_substatus(queryset)
+        if 'posts' in fields:
+            queryset = queryset.prefetch_related(posts_prefetch(), latest_comments_prefetch('user__posts__comments'))
+        if 'fight_records' in fields:
+            queryset = queryset.prefetch_related(fight_records_prefetch())
+        return queryset
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -23,10 +52,20 @@ class ProfileListView(generics.ListAPIView):
 
 
 class UserProfileView(generics.RetrieveAPIView):
-    queryset = CustomUser.objects.all()
     lookup_field = 'username'
     serializer_class = CombinedUserProfileSerializer
 
+    def get_queryset(self):
+        # A fixed set of queries for the whole page: user with promotion profile, profile with
+        # stats and latest substatus, fight records, posts and their comment previews
+        profile_queryset = with_latest_substatus(UserProfile.objects.select_related('stats'))
+        return CustomUser.objects.select_related('promotion_profile').prefetch_related(
+            Prefetch('profile', queryset=profile_queryset),
+            fight_records_prefetch('profile__fight_records'),
+            posts_prefetch('posts'),
+            latest_comments_prefetch('posts__comments'),
+        )
+
     def retrieve(self, request, *args, **kwargs):
         username = self.kwargs.get(self.lookup_field)
         user = self.get_queryset().filter(username=username).first()
@@ -119,6 +158,17 @@ class PostDeleteView(generics.DestroyAPIView):
             raise PermissionDenied("You do not have permission to delete this post.")
         return obj
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # The post's likes and comments no longer count towards the author's totals. The counters
+        # are read under a row lock, since likes may have landed after the post was loaded
+        counters = Post.objects.select_for_update().values(*Post.COUNTER_FIELDS).get(pk=instance.pk)
+        UserProfile.objects.filter(user_id=instance.user_id).update(
+            total_likes=F('total_likes') - counters['likes_count'],
+            total_comments=F('total_comments') - counters['comments_count']
+        )
+        instance.delete()
+
 class PostUpdateView(generics.UpdateAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
@@ -137,10 +187,15 @@ class PostLikeView(APIView):
     def post(self, request, pk):
         try:
             post = Post.objects.get(pk=pk)
-            like, created = Like.objects.get_or_create(user=request.user, post=post)
+            with transaction.atomic():
+                like, created = Like.objects.get_or_create(user=request.user, post=post)
+                if not created:
+                    like.delete()
+                delta = 1 if created else -1
+                Post.objects.filter(pk=post.pk).update(likes_count=F('likes_count') + delta)
+                UserProfile.objects.filter(user_id=post.user_id).update(total_likes=F('total_likes') + delta)
 
             if not created:
-                like.delete()
                 return Response({'status': 'unliked'})
             return Response({'status': 'liked'})
         except Post.DoesNotExist:
@@ -156,7 +211,10 @@ class PostCommentView(APIView):
             serializer = CommentSerializer(data=request.data)
 
             if serializer.is_valid():
-                serializer.save(user=request.user, post=post)
+                with transaction.atomic():
+                    serializer.save(user=request.user, post=post)
+                    Post.objects.filter(pk=post.pk).update(comments_count=F('comments_count') + 1)
+                    UserProfile.objects.filter(user_id=post.user_id).update(total_comments=F('total_comments') + 1)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Post.DoesNotExist:
@@ -168,7 +226,7 @@ class PostDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Post.objects.prefetch_related('comments', 'likes').all()
+        return Post.objects.select_related('user__profile').prefetch_related(latest_comments_prefetch())
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -176,6 +234,16 @@ class PostDetailView(generics.RetrieveAPIView):
         return context
 
 
+class PostCommentListView(generics.ListAPIView):
+    serializer_class = CommentSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        post = get_object_or_404(Post, pk=self.kwargs['pk'])
+        return Comment.objects.filter(post=post).select_related('user__profile')
+
+
 class FightRecordCreateView(generics.CreateAPIView):
     serializer_class = FightRecordSerializer
     permission_classes = [IsAuthenticated]
@@ -229,4 +297,33 @@ class UnapprovedFightRecordListView(generics.ListAPIView):
         ).select_related('user_profile__user').order_by('-created_at')
 
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
\ No newline at end of file
+        return super().get(request, *args, **kwargs)
+
+
+class LeaderboardView(generics.ListAPIView):
+    """
+    Top fighters of one sport and weight: ?sport=boxing&weight=72&sort=wins|win_rate|rating,
+    served from the precomputed LeaderboardEntry table.
+    """
+    serializer_class = LeaderboardEntrySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = LeaderboardPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        sport = normalize_text(params.get('sport'))
+        if not sport:
+            raise ValidationError({'sport': "This parameter is required."})
+        try:
+            weight = int(params['weight'])
+        except KeyError:
+            raise ValidationError({'weight': "This parameter is required."})
+        except ValueError:
+            raise ValidationError({'weight': "Expected a weight in kg."})
+        self.sort_field = params.get('sort', 'rating')
+        if self.sort_field not in SORT_FIELDS:
+            raise ValidationError({'sort': f"Expected one of {', '.join(SORT_FIELDS)}."})
+
+        return LeaderboardEntry.objects.filter(
+            sport=sport, weight_class=weight_class(weight)
+        ).select_related('user_profile__user').order_by(f'-{self.sort_field}', '-pk')